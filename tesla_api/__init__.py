@@ -1,13 +1,23 @@
 import asyncio
+import contextlib
 import json
+import os
 import time
 import aiohttp
 
-from .exceptions import ApiError, AuthenticationError, VehicleUnavailableError
+from .exceptions import ApiError, AuthenticationError, DeadlineExceededError, VehicleUnavailableError
 from .vehicle import Vehicle
 from .energy import Energy
+from .deadline import Deadline, remaining, wait_until
+from .events import EventDispatcher
+from .hedging import Hedger, endpoint_key
+from .history import HistoryParser
+from .scheduler import RequestScheduler, request_priority, use_priority
+from .stream import iter_json_array
 from .const import (
     EnergySites,
+    EventType,
+    RequestPriority,
     TESLA_API_TOKEN_URL,
     TESLA_API_URL,
     OAUTH_CLIENT_ID,
@@ -15,6 +25,7 @@ from .const import (
     TESLA_API_URL_PRODUCTS,
     TESLA_API_URL_VEHICLES,
     TESLA_API_OAUTH2_URL,
+    STREAM_CHUNK_SIZE,
 )
 
 
@@ -22,8 +33,10 @@ class TeslaApiClient:
     callback_update = None  # Called when vehicle's state has been updated.
     callback_wake_up = None  # Called when attempting to wake a vehicle.
     timeout = 30  # Default timeout for operations such as Vehicle.wake_up().
+    discovery_ttl = 300  # Seconds to cache the vehicles and products listings.
+    discovery_min_age = 60  # Seconds before a lookup of an unknown id fetches a listing again.
 
-    def __init__(self, token=None, on_new_token=None):
+    def __init__(self, token=None, on_new_token=None, parse_workers=0, cache_file=None, session=None):
         """Creates client from provided credentials.
 
         If token is not provided, or is no longer valid, then a new token will
@@ -33,11 +46,45 @@ class TeslaApiClient:
         This should be used to save the token, both after initial login and after an
         automatic token renewal. The token is returned as a string and can be passed
         directly into this constructor.
+
+        Requests are ordered by the client's scheduler: get() defaults to the
+        FOREGROUND priority and post(), which sends commands, to INTERACTIVE. See
+        priority() and RequestScheduler.
+
+        Every request method accepts a timeout in seconds, and deadline() limits the
+        time spent on everything within a block. When either expires, the request is
+        cancelled. Without either, aiohttp's default timeout applies.
+
+        If parse_workers is set, large calendar history responses requested through
+        Energy.get_energy_site_calendar_history_arrays() are parsed in a pool of that
+        many worker processes. See HistoryParser.
+
+        If cache_file is provided, the vehicles and products listings are saved to it
+        and loaded from it on creation, so that listing them again within
+        discovery_ttl seconds, even after a restart, needs no request.
+
+        If session is provided, it is used instead of a new aiohttp.ClientSession.
+        The client closes it when it is closed.
         """
         assert token is not None
         self._token = json.loads(token) if token else None
         self._new_token_callback = on_new_token
-        self._session = aiohttp.ClientSession()
+        self._session = session or aiohttp.ClientSession()
+        self.history_parser = HistoryParser(workers=parse_workers)
+        self._cache_file = cache_file
+        self._discovery = {}
+        if cache_file is not None and os.path.exists(cache_file):
+            with open(cache_file) as file:
+                self._discovery = json.load(file)
+        # Identity maps of the Vehicle and Energy objects by id.
+        self._vehicles = {}
+        self._energy_sites = {}
+        self.scheduler = RequestScheduler()
+        self.hedger = Hedger()
+        self.events = EventDispatcher()
+        self.events.add_handler(EventType.UPDATE, self._on_update)
+        self.events.add_handler(EventType.WAKE_UP, self._on_wake_up)
+        self.events.add_handler(EventType.NEW_TOKEN, self._on_new_token)
 
     async def __aenter__(self):
         return self
@@ -46,7 +93,22 @@ class TeslaApiClient:
         await self.close()
 
     async def close(self):
+        await self.events.close()
         await self._session.close()
+        self.history_parser.close()
+
+    # Handlers for self.events, which run the callbacks configured on the client.
+    async def _on_update(self, vehicle):
+        if self.callback_update is not None:
+            await self.callback_update(vehicle)
+
+    async def _on_wake_up(self, vehicle):
+        if self.callback_wake_up is not None:
+            await self.callback_wake_up(vehicle)
+
+    async def _on_new_token(self, token):
+        if self._new_token_callback:
+            await self._new_token_callback(token)
 
     def _get_headers(self):
         return {
@@ -94,55 +156,260 @@ class TeslaApiClient:
 
     async def refresh_token(self):
         # Get tokens from the token file which contains both oauth and authentication tokens
-        if self.check_token_expiration() is True:
+        async with self.scheduler.slot(RequestPriority.TOKEN_REFRESH):
+            # Another request may have refreshed the token while this one was queued.
+            if self.check_token_expiration() is True:
 
-            access_token = await self.get_access_token(self._token["oauth_token"]["refresh_token"])
+                access_token = await self.get_access_token(self._token["oauth_token"]["refresh_token"])
 
-            if access_token is not None:
-                new_token = await self.get_authentication_token(access_token)
+                new_token = None
+                if access_token is not None:
+                    new_token = await self.get_authentication_token(access_token)
 
-            if new_token is not None:
-                self._token["authentication_token"] = new_token
+                if new_token is not None:
+                    self._token["authentication_token"] = new_token
+                    return True
+        return False
 
     async def authenticate(self):
         if self.check_token_expiration() is True:
-            await self.refresh_token()
-            # Send token to application via callback.
-            if self._new_token_callback:
-                asyncio.create_task(self._new_token_callback(json.dumps(self._token)))
+            if await self.refresh_token():
+                # Send token to application via callback.
+                await self.events.publish(EventType.NEW_TOKEN, json.dumps(self._token))
         return True
 
-    async def get(self, endpoint, params=None):
-        await self.authenticate()
-        url = '{}/{}'.format(TESLA_API_URL, endpoint)
+    def priority(self, priority):
+        """Context manager which sets the default priority of requests made within it.
 
-        async with self._session.get(url, headers=self._get_headers(), params=params) as resp:
-            response_json = await resp.json()
+        For example, background polling can be run in a
+        `with client.priority(RequestPriority.BACKGROUND):` block so that commands
+        are sent before it.
+        """
+        return use_priority(priority)
+
+    @staticmethod
+    def _get_priority(priority, default):
+        if priority is None:
+            priority = request_priority.get()
+        return default if priority is None else priority
 
+    @staticmethod
+    def _check_error(response_json):
         if 'error' in response_json:
             if 'vehicle unavailable' in response_json['error']:
                 raise VehicleUnavailableError()
             raise ApiError(response_json['error'])
 
+    def deadline(self, timeout):
+        """Return an async context manager that limits the time spent within it.
+
+        The deadline covers everything in the block, including waking vehicles,
+        retries, token refreshes, queueing and the HTTP requests themselves. When it
+        expires, the remaining work is cancelled and DeadlineExceededError is raised.
+        For example:
+
+            async with client.deadline(5):
+                await vehicle.controls.door_unlock()
+        """
+        return Deadline(timeout)
+
+    async def _fetch_json(self, url, params):
+        async with self._session.get(url, headers=self._get_headers(), params=params) as resp:
+            return await resp.json()
+
+    async def get(self, endpoint, params=None, priority=None, timeout=None, hedge=False):
+        """Perform a GET request and return the response.
+
+        If hedge is set, a duplicate request is sent when the response is slower than
+        usual for the endpoint, and the first response is used. See Hedger. Only the
+        HTTP exchange is hedged and timed, not authentication or queueing.
+        """
+        async with self.deadline(timeout):
+            await self.authenticate()
+            url = '{}/{}'.format(TESLA_API_URL, endpoint)
+
+            async with self.scheduler.slot(self._get_priority(priority, RequestPriority.FOREGROUND)):
+                if hedge:
+                    response_json = await self.hedger.request(
+                        endpoint_key(endpoint), lambda: self._fetch_json(url, params))
+                else:
+                    response_json = await self._fetch_json(url, params)
+
+        self._check_error(response_json)
+        return response_json['response']
+
+    async def post(self, endpoint, data=None, priority=None, timeout=None):
+        async with self.deadline(timeout):
+            await self.authenticate()
+            url = '{}/{}'.format(TESLA_API_URL, endpoint)
+
+            async with self.scheduler.slot(self._get_priority(priority, RequestPriority.INTERACTIVE)):
+                async with self._session.post(url, headers=self._get_headers(), json=data) as resp:
+                    response_json = await resp.json()
+
+        self._check_error(response_json)
         return response_json['response']
 
-    async def post(self, endpoint, data=None):
-        await self.authenticate()
+    async def get_body(self, endpoint, params=None, priority=None, timeout=None):
+        """Perform a GET request and return the raw body without decoding it."""
+        async with self.deadline(timeout):
+            await self.authenticate()
+            url = '{}/{}'.format(TESLA_API_URL, endpoint)
+
+            async with self.scheduler.slot(self._get_priority(priority, RequestPriority.FOREGROUND)):
+                async with self._session.get(url, headers=self._get_headers(), params=params) as resp:
+                    if resp.status != 200:
+                        response_json = await resp.json()
+                        self._check_error(response_json)
+                        raise ApiError(resp.reason)
+                    return await resp.read()
+
+    async def stream(self, endpoint, key, params=None, priority=None, timeout=None):
+        """Perform a GET request and yield the elements of an array in the response.
+
+        Unlike get(), the body is parsed incrementally as it arrives, so memory use is
+        bounded by the size of a single element rather than the whole response.
+
+        Args:
+            endpoint: The endpoint to request.
+            key: Name of the array in the response to yield, e.g. 'time_series'.
+            params: Optional query parameters.
+            priority: The RequestPriority, defaults to FOREGROUND.
+            timeout: Seconds to complete the whole request in, including the time
+                spent by the caller between elements.
+        """
+        # The generator runs in the caller's task, so unlike the other requests it
+        # must not use a Deadline, which would cancel that task. Every wait is
+        # limited instead, and the time is checked whenever the caller resumes.
+        loop = asyncio.get_running_loop()
+        outer = remaining()
+        if timeout is None or (outer is not None and outer <= timeout):
+            # An outer deadline of the caller expires first and cancels it itself.
+            expiry = None
+        else:
+            expiry = loop.time() + timeout
+
+        await wait_until(self.authenticate(), expiry)
         url = '{}/{}'.format(TESLA_API_URL, endpoint)
 
-        async with self._session.post(url, headers=self._get_headers(), json=data) as resp:
-            response_json = await resp.json()
+        async with contextlib.AsyncExitStack() as stack:
+            await wait_until(stack.enter_async_context(
+                self.scheduler.slot(self._get_priority(priority, RequestPriority.FOREGROUND))), expiry)
+            resp = await wait_until(stack.enter_async_context(
+                self._session.get(url, headers=self._get_headers(), params=params)), expiry)
+            if resp.status != 200:
+                response_json = await wait_until(resp.json(), expiry)
+                self._check_error(response_json)
+                raise ApiError(resp.reason)
 
-        if 'error' in response_json:
-            if 'vehicle unavailable' in response_json['error']:
-                raise VehicleUnavailableError()
-            raise ApiError(response_json['error'])
+            async for element in iter_json_array(self._iter_chunks(resp, expiry), key):
+                yield element
+                if expiry is not None and loop.time() >= expiry:
+                    raise DeadlineExceededError()
 
-        return response_json['response']
+    @staticmethod
+    async def _iter_chunks(resp, expiry):
+        chunks = resp.content.iter_chunked(STREAM_CHUNK_SIZE).__aiter__()
+        while True:
+            try:
+                chunk = await wait_until(chunks.__anext__(), expiry)
+            except StopAsyncIteration:
+                return
+            yield chunk
+
+    async def _discover(self, endpoint, refresh):
+        """Return the cached response of a product listing endpoint, or fetch it.
 
-    async def list_vehicles(self):
-        return [Vehicle(self, vehicle) for vehicle in await self.get(TESLA_API_URL_VEHICLES)]
+        Returns:
+            A tuple of the response and whether it was fetched rather than cached.
+        """
+        cached = self._discovery.get(endpoint)
+        if not refresh and cached is not None and time.time() - cached['time'] < self.discovery_ttl:
+            return cached['response'], False
 
-    async def list_energy_sites(self):
-        return [Energy(self, product[EnergySites.ENERGY_SITE_ID.value]) for
-                product in await self.get(TESLA_API_URL_PRODUCTS) if EnergySites.ENERGY_SITE_ID.value in product]
+        response = await self.get(endpoint)
+        self._discovery[endpoint] = {'time': time.time(), 'response': response}
+        if self._cache_file is not None:
+            with open(self._cache_file, 'w') as file:
+                json.dump(self._discovery, file)
+        return response, True
+
+    def _discovery_age(self, endpoint):
+        # Seconds since the listing was fetched, or infinity if it is not cached.
+        cached = self._discovery.get(endpoint)
+        if cached is None:
+            return float('inf')
+        return time.time() - cached['time']
+
+    async def list_vehicles(self, refresh=False):
+        """Return the vehicles of the account.
+
+        The listing is cached for discovery_ttl seconds, unless refresh is set. The
+        same Vehicle object is returned for a vehicle every time, and is updated with
+        the state from the listing when it is fetched again. A cached state may be
+        out of date, use Vehicle.update() to get the current state.
+        """
+        response, fetched = await self._discover(TESLA_API_URL_VEHICLES, refresh)
+        if fetched:
+            # Forget vehicles that have been removed from the account.
+            ids = {data['id'] for data in response}
+            self._vehicles = {vehicle_id: vehicle for vehicle_id, vehicle in self._vehicles.items()
+                              if vehicle_id in ids}
+        vehicles = []
+        for data in response:
+            vehicle = self._vehicles.get(data['id'])
+            if vehicle is None:
+                vehicle = self._vehicles[data['id']] = Vehicle(self, data)
+            elif fetched:
+                await vehicle._update_vehicle(data)
+            vehicles.append(vehicle)
+        return vehicles
+
+    async def list_energy_sites(self, refresh=False):
+        """Return the energy sites of the account.
+
+        The listing is cached for discovery_ttl seconds, unless refresh is set. The
+        same Energy object is returned for a site every time.
+        """
+        response, fetched = await self._discover(TESLA_API_URL_PRODUCTS, refresh)
+        if fetched:
+            # Forget sites that have been removed from the account.
+            ids = {product[EnergySites.ENERGY_SITE_ID.value] for product in response
+                   if EnergySites.ENERGY_SITE_ID.value in product}
+            self._energy_sites = {site_id: energy_site for site_id, energy_site in self._energy_sites.items()
+                                  if site_id in ids}
+        energy_sites = []
+        for product in response:
+            if EnergySites.ENERGY_SITE_ID.value in product:
+                site_id = product[EnergySites.ENERGY_SITE_ID.value]
+                energy_site = self._energy_sites.get(site_id)
+                if energy_site is None:
+                    energy_site = self._energy_sites[site_id] = Energy(self, site_id)
+                energy_sites.append(energy_site)
+        return energy_sites
+
+    async def get_vehicle(self, vehicle_id):
+        """Return the Vehicle with the given id, or None if the account has no such vehicle.
+
+        If the vehicle is not in the cached listing, the listing is fetched again, as
+        the vehicle may have been added since, unless it is less than
+        discovery_min_age seconds old.
+        """
+        if vehicle_id not in self._vehicles:
+            await self.list_vehicles()
+        if vehicle_id not in self._vehicles and self._discovery_age(TESLA_API_URL_VEHICLES) >= self.discovery_min_age:
+            await self.list_vehicles(refresh=True)
+        return self._vehicles.get(vehicle_id)
+
+    async def get_energy_site(self, site_id):
+        """Return the Energy site with the given id, or None if the account has no such site.
+
+        If the site is not in the cached listing, the listing is fetched again, as the
+        site may have been added since, unless it is less than discovery_min_age
+        seconds old.
+        """
+        if site_id not in self._energy_sites:
+            await self.list_energy_sites()
+        if site_id not in self._energy_sites and self._discovery_age(TESLA_API_URL_PRODUCTS) >= self.discovery_min_age:
+            await self.list_energy_sites(refresh=True)
+        return self._energy_sites.get(site_id)
@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 TESLA_API_BASE_URL = 'https://owner-api.teslamotors.com/'
 TESLA_API_AUTH_URL = 'https://auth.tesla.com/'
@@ -27,6 +27,8 @@ TESLA_API_PERIOD = 'period'
 TESLA_API_KIND = 'kind'
 TESLA_API_END_DATE = 'end_date'
 
+STREAM_CHUNK_SIZE = 65536
+
 
 class SiteInfo(Enum):
     ID = 'id'
@@ -198,3 +200,25 @@ class PowerwallMode(Enum):
     AUTONOMOUS = 'autonomous'
     BACKUP = 'backup'
     SELF_CONSUMPTION = 'self_consumption'
+
+
+class EventType(Enum):
+    # Events published by TeslaApiClient.events
+    UPDATE = 'update'  # Payload is the Vehicle whose state has been updated.
+    WAKE_UP = 'wake_up'  # Payload is the Vehicle that is being woken up.
+    NEW_TOKEN = 'new_token'  # Payload is the new token as a string.
+
+
+class EventPolicy(Enum):
+    # What EventDispatcher.publish() does with an event
+    DROP = 'drop'  # Drop the event if the queue is full.
+    COALESCE = 'coalesce'  # Replace a queued event with the same key, else drop if full.
+    LATEST = 'latest'  # Keep the latest event outside the queue, delivered first.
+
+
+class RequestPriority(IntEnum):
+    # Priority classes of RequestScheduler, highest priority first
+    INTERACTIVE = 0  # User-facing commands.
+    TOKEN_REFRESH = 1
+    FOREGROUND = 2  # Reads that someone is waiting for.
+    BACKGROUND = 3  # Polling and exports.
@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+
+from .exceptions import DeadlineExceededError
+
+# Event loop time at which the innermost active deadline expires, and the task it
+# cancels. Tasks created within a deadline inherit this, but are not cancelled by
+# it, so a deadline only applies to the task that owns it.
+current_deadline = contextvars.ContextVar('current_deadline', default=None)
+
+
+def _current():
+    deadline = current_deadline.get()
+    if deadline is None or deadline[1] is not asyncio.current_task():
+        return None
+    return deadline[0]
+
+
+def remaining():
+    """Return the seconds left until the current task's deadline, or None if there is none."""
+    when = _current()
+    if when is None:
+        return None
+    return max(when - asyncio.get_running_loop().time(), 0)
+
+
+async def wait_until(awaitable, when):
+    """Await awaitable, raising DeadlineExceededError if it is not done at loop time when.
+
+    Unlike Deadline, this does not cancel the current task, so it can be used where
+    the current task belongs to someone else, such as in an async generator.
+    """
+    if when is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(when - asyncio.get_running_loop().time(), 0))
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError() from None
+
+
+class Deadline:
+    """Async context manager that limits the time spent in its block.
+
+    The deadline applies to everything awaited within the block, including
+    requests made from it: they can find the time left with remaining(). When the
+    deadline expires, the block is cancelled and DeadlineExceededError is raised.
+    Nested deadlines can only shorten the time available, never extend it. Tasks
+    created within the block are only limited by it while the block awaits them.
+
+    Args:
+        timeout: Seconds until the deadline. None only inherits an outer deadline.
+    """
+
+    def __init__(self, timeout):
+        self._timeout = timeout
+        self._token = None
+        self._handle = None
+        self._task = None
+        self.expired = False
+
+    async def __aenter__(self):
+        if self._timeout is None:
+            return self
+
+        loop = asyncio.get_running_loop()
+        when = loop.time() + self._timeout
+        outer = _current()
+        if outer is not None and outer <= when:
+            # The outer deadline expires first and will cancel the block itself.
+            return self
+
+        self._task = asyncio.current_task()
+        self._token = current_deadline.set((when, self._task))
+        self._handle = loop.call_at(when, self._expire)
+        return self
+
+    def _expire(self):
+        self.expired = True
+        self._task.cancel()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._handle is None:
+            return
+        self._handle.cancel()
+        current_deadline.reset(self._token)
+
+        if self.expired and exc_type is asyncio.CancelledError:
+            if hasattr(self._task, 'uncancel'):
+                self._task.uncancel()
+            raise DeadlineExceededError() from exc_val
@@ -96,6 +96,26 @@ class Energy:
         info = await self.get_energy_site_info()
         return int(info[EnergySites.BATTERY_COUNT.value])
 
+    @staticmethod
+    def _calendar_history_params(kind, period, end_date):
+        params = {TESLA_API_KIND: kind, TESLA_API_PERIOD: period}
+
+        if isinstance(end_date, date):
+            if not isinstance(end_date, datetime):
+                end_date = datetime.combine(end_date, time(23, 59, 59))
+            elif end_date.hour == 0 and end_date.minute == 0:
+                # If the datetime object's time is 00:00 then the API returns nothing.
+                # We adjust by adding 23:59, so it's possible to use
+                # datetime(year=2020, month=5, day=2) and it gets the data for
+                # May 2, 2020 as expected.
+                end_date = end_date.replace(hour=23, minute=59, second=59)
+            end_date = end_date.isoformat()
+
+        if end_date is not None:
+            params[TESLA_API_END_DATE] = end_date
+
+        return params
+
     async def get_energy_site_calendar_history_data(
             self, kind=HistoryType.ENERGY.value, period=HistoryPeriod.DAY.value,
             end_date: Optional[Union[str, date]] = None) -> dict:
@@ -112,27 +132,45 @@ class Energy:
                 with datetime(year=2020, month=5, day=1), this gets all data for May 1st.
                 Defaults to the current time.
         """
-        params = {TESLA_API_KIND: kind, TESLA_API_PERIOD: period}
+        return await self._api_client.get('{}/{}/{}'.format(
+            TESLA_API_URL_ENERGY_SITES,
+            self._energy_site_id,
+            TESLA_API_URL_CALENDAR_HISTORY),
+            params=self._calendar_history_params(kind, period, end_date))
 
-        if isinstance(end_date, date):
-            if not isinstance(end_date, datetime):
-                end_date = datetime.combine(end_date, time(23, 59, 59))
-            elif end_date.hour == 0 and end_date.minute == 0:
-                # If the datetime object's time is 00:00 then the API returns nothing.
-                # We adjust by adding 23:59, so it's possible to use
-                # datetime(year=2020, month=5, day=2) and it gets the data for
-                # May 2, 2020 as expected.
-                end_date = end_date.replace(hour=23, minute=59, second=59)
-            end_date = end_date.isoformat()
+    async def iter_energy_site_calendar_history_data(
+            self, kind=HistoryType.ENERGY.value, period=HistoryPeriod.DAY.value,
+            end_date: Optional[Union[str, date]] = None):
+        """Yield the time_series entries of historical energy data as they arrive.
 
-        if end_date is not None:
-            params[TESLA_API_END_DATE] = end_date
+        Takes the same arguments as get_energy_site_calendar_history_data(), but parses
+        the response incrementally, so long periods such as year and lifetime can be
+        processed without holding the whole response in memory.
+        """
+        async for entry in self._api_client.stream('{}/{}/{}'.format(
+                TESLA_API_URL_ENERGY_SITES,
+                self._energy_site_id,
+                TESLA_API_URL_CALENDAR_HISTORY),
+                HistoryData.TIME_SERIES.value,
+                params=self._calendar_history_params(kind, period, end_date)):
+            yield entry
 
-        return await self._api_client.get('{}/{}/{}'.format(
+    async def get_energy_site_calendar_history_arrays(
+            self, kind=HistoryType.ENERGY.value, period=HistoryPeriod.DAY.value,
+            end_date: Optional[Union[str, date]] = None) -> dict:
+        """Return historical energy data with the time_series as compact arrays.
+
+        Takes the same arguments as get_energy_site_calendar_history_data(). The
+        time_series is returned as a dict of columns, see history.parse_history().
+        Large responses are parsed by the client's history_parser, which may use a
+        process pool.
+        """
+        body = await self._api_client.get_body('{}/{}/{}'.format(
             TESLA_API_URL_ENERGY_SITES,
             self._energy_site_id,
             TESLA_API_URL_CALENDAR_HISTORY),
-            params=params)
+            params=self._calendar_history_params(kind, period, end_date))
+        return await self._api_client.history_parser.parse(body)
 
     # Helper functions for get_energy_site_calendar_history_data
     async def get_energy_site_power_history(self):
@@ -152,11 +190,13 @@ class Energy:
         return timestamp, solar_percent, battery_percent
 
     # Live Status Information
-    async def get_energy_site_live_status(self):
+    # With hedge set, slow requests are duplicated, see TeslaApiClient.get()
+    async def get_energy_site_live_status(self, hedge=False):
         return await self._api_client.get('{}/{}/{}'.format(
             TESLA_API_URL_ENERGY_SITES,
             self._energy_site_id,
-            TESLA_API_URL_LIVE_STATUS))
+            TESLA_API_URL_LIVE_STATUS),
+            hedge=hedge)
 
     async def print_energy_site_live_status(self):
         info = await self.get_energy_site_live_status()
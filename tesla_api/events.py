@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+import logging
+from collections import deque, namedtuple
+
+from .const import EventPolicy, EventType
+
+_LOGGER = logging.getLogger(__name__)
+
+Event = namedtuple('Event', ['type', 'payload'])
+
+DEFAULT_POLICIES = {
+    # Only the latest state of a vehicle is of interest.
+    EventType.UPDATE: EventPolicy.COALESCE,
+    EventType.WAKE_UP: EventPolicy.DROP,
+    # A new token must be saved, or the application is logged out. It is published
+    # by whichever request refreshed the token, which must not wait for the queue.
+    EventType.NEW_TOKEN: EventPolicy.LATEST,
+}
+
+
+class Subscription:
+    """Async iterator over the events of an EventDispatcher.
+
+    Events are buffered in a queue of maxsize; if the consumer falls behind, the
+    oldest buffered events are dropped, so a slow consumer never holds up the
+    dispatcher.
+    """
+
+    def __init__(self, dispatcher, event_types, maxsize):
+        self._dispatcher = dispatcher
+        self.event_types = event_types
+        self._queue = deque(maxlen=maxsize)
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.dropped = 0
+
+    def _put(self, event):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+        self._ready.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._queue:
+            if self._closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._closed = True
+        self._dispatcher._subscribers.discard(self)
+        self._ready.set()
+
+
+class EventDispatcher:
+    """Delivers events to handlers and subscribers from a bounded queue.
+
+    Published events are queued and delivered by a fixed number of worker tasks,
+    so publishing never creates tasks and a slow handler only delays other events
+    rather than the code publishing them. What happens when the queue is full is
+    decided per event type by policies, see EventPolicy. Events with the LATEST
+    policy are never dropped: only the latest one of each type is kept, outside of
+    the queue, and delivered before queued events. Exceptions raised by handlers
+    are logged and counted in errors.
+
+    Args:
+        maxsize: Maximum number of queued events.
+        workers: Number of worker tasks delivering events.
+        policies: Dict of EventType to EventPolicy, overriding DEFAULT_POLICIES.
+    """
+
+    def __init__(self, maxsize=1000, workers=2, policies=None):
+        self._maxsize = maxsize
+        self._workers = workers
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+        self._handlers = {}
+        self._subscribers = set()
+        self._order = deque()  # Keys of queued events, in order of publishing.
+        self._events = {}  # Queued events by key.
+        self._latest = {}  # Latest event by type, for the LATEST policy.
+        self._counter = 0
+        self._active = 0
+        self._condition = None
+        self._tasks = []
+        self.dropped = 0
+        self.errors = 0
+
+    def add_handler(self, event_type, handler):
+        """Call the coroutine function handler with the payload of every event_type event."""
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def subscribe(self, *event_types, maxsize=100):
+        """Return a Subscription for the given event types, or all events if none are given."""
+        subscription = Subscription(self, event_types, maxsize)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def _start(self):
+        self._condition = asyncio.Condition()
+        # Start the workers in an empty context, so handlers do not inherit the
+        # priority or deadline of whichever code happened to publish first.
+        self._tasks = [contextvars.Context().run(asyncio.create_task, self._worker())
+                       for _ in range(self._workers)]
+
+    async def publish(self, event_type, payload, key=None):
+        """Queue an event for delivery.
+
+        Args:
+            event_type: The EventType.
+            payload: The payload passed to handlers.
+            key: Events of the same type and key replace each other while queued
+                if the policy is COALESCE, e.g. the vehicle id for updates.
+
+        Returns:
+            False if the event was dropped, otherwise True.
+        """
+        if self._condition is None:
+            self._start()
+        policy = self.policies.get(event_type, EventPolicy.DROP)
+
+        async with self._condition:
+            if policy is EventPolicy.LATEST:
+                self._latest[event_type] = Event(event_type, payload)
+                self._condition.notify_all()
+                return True
+
+            if policy is EventPolicy.COALESCE:
+                key = (event_type, key)
+                if key in self._events:
+                    self._events[key] = Event(event_type, payload)
+                    return True
+            else:
+                self._counter += 1
+                key = self._counter
+
+            if len(self._order) >= self._maxsize:
+                self.dropped += 1
+                return False
+
+            self._order.append(key)
+            self._events[key] = Event(event_type, payload)
+            self._condition.notify_all()
+        return True
+
+    async def _worker(self):
+        while True:
+            async with self._condition:
+                while not self._order and not self._latest:
+                    await self._condition.wait()
+                if self._latest:
+                    event = self._latest.pop(next(iter(self._latest)))
+                else:
+                    event = self._events.pop(self._order.popleft())
+                self._active += 1
+                self._condition.notify_all()
+
+            try:
+                await self._deliver(event)
+            finally:
+                async with self._condition:
+                    self._active -= 1
+                    self._condition.notify_all()
+
+    async def _deliver(self, event):
+        for subscription in list(self._subscribers):
+            if not subscription.event_types or event.type in subscription.event_types:
+                subscription._put(event)
+
+        for handler in self._handlers.get(event.type, ()):
+            try:
+                await handler(event.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                _LOGGER.exception('Handler for %s event failed', event.type.value)
+
+    async def close(self, timeout=5):
+        """Deliver the queued events, waiting at most timeout seconds, and stop the workers."""
+        if self._condition is None:
+            return
+
+        async def _drain():
+            async with self._condition:
+                while self._order or self._latest or self._active:
+                    await self._condition.wait()
+
+        try:
+            await asyncio.wait_for(_drain(), timeout)
+        except asyncio.TimeoutError:
+            _LOGGER.warning('Dropping %d undelivered events', len(self._order) + len(self._latest))
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._condition = None
+            self._tasks = []
+            self._order.clear()
+            self._events.clear()
+            self._latest.clear()
+            for subscription in list(self._subscribers):
+                subscription.close()
@@ -1,3 +1,6 @@
+import asyncio
+
+
 class AuthenticationError(Exception):
     def __init__(self, error):
         super().__init__('Authentication to the Tesla API failed: {}'.format(error))
@@ -12,3 +15,13 @@ class ApiError(Exception):
 class VehicleUnavailableError(Exception):
     def __init__(self):
         super().__init__('Vehicle failed to wake up.')
+
+
+class RequestPreemptedError(Exception):
+    def __init__(self):
+        super().__init__('Queued request was preempted by higher priority work.')
+
+
+class DeadlineExceededError(asyncio.TimeoutError):
+    def __init__(self):
+        super().__init__('Deadline exceeded before the operation completed.')
@@ -0,0 +1,319 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .const import (
+    HistoryType,
+    HistoryPeriod,
+    LiveStatus,
+    RequestPriority,
+    TESLA_API_URL_LIVE_STATUS,
+)
+from .scheduler import use_priority
+from .utils import parse_timestamp
+
+_LOGGER = logging.getLogger(__name__)
+
+SITE_ID = 'site_id'
+MEASUREMENT = 'measurement'
+
+
+class Exporter:
+    """Base class for the streaming exporters.
+
+    Points are buffered and written out in chunks of chunk_size, so the exporter
+    never holds more than one chunk in memory.
+
+    If checkpoint_file is provided, the timestamp of the last exported point per
+    site and measurement is loaded from it on creation and saved to it after every
+    chunk. Points at or before the checkpoint are skipped by write(), which allows
+    an interrupted export to be resumed by simply running it again.
+    """
+
+    def __init__(self, path, chunk_size=1000, checkpoint_file=None):
+        self._path = path
+        self._chunk_size = chunk_size
+        self._chunk = []
+        self._checkpoint_file = checkpoint_file
+        self.checkpoint = {}
+        if checkpoint_file is not None and os.path.exists(checkpoint_file):
+            with open(checkpoint_file) as file:
+                self.checkpoint = json.load(file)
+        # Parsed timestamps of the last point accepted for each checkpoint key.
+        self._last = {key: parse_timestamp(value) for key, value in self.checkpoint.items()}
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, site_id, measurement, point):
+        """Queue a single point for export.
+
+        Returns:
+            False if the point was skipped because it is not newer than the last
+            point exported for this site and measurement, otherwise True.
+        """
+        key = '{}/{}'.format(site_id, measurement)
+        timestamp = parse_timestamp(point[LiveStatus.TIMESTAMP.value])
+        last = self._last.get(key)
+        if last is not None and timestamp <= last:
+            return False
+
+        self._last[key] = timestamp
+        self._pending[key] = point[LiveStatus.TIMESTAMP.value]
+        self._chunk.append((site_id, measurement, timestamp, point))
+        if len(self._chunk) >= self._chunk_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        if self._chunk:
+            self._write_chunk(self._chunk)
+            self._chunk = []
+
+        # Only advance the checkpoint once the points have actually been written.
+        if self._pending:
+            self.checkpoint.update(self._pending)
+            self._pending = {}
+            if self._checkpoint_file is not None:
+                with open(self._checkpoint_file, 'w') as file:
+                    json.dump(self.checkpoint, file)
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def _write_chunk(self, chunk):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class _TextExporter(Exporter):
+    # Text formats are appended to, so resuming an export continues the same file.
+    def __init__(self, path, chunk_size=1000, checkpoint_file=None):
+        super().__init__(path, chunk_size, checkpoint_file)
+        self._file = open(path, 'a', newline='')
+
+    def _close(self):
+        self._file.close()
+
+
+class CsvExporter(_TextExporter):
+    """Export points as CSV with one column per field.
+
+    The columns are taken from the header of an existing file, or otherwise from
+    the fields of the first point written. Fields missing from a point are left
+    empty and fields not in the header are ignored.
+    """
+
+    def __init__(self, path, chunk_size=1000, checkpoint_file=None):
+        fieldnames = None
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, newline='') as file:
+                fieldnames = next(csv.reader(file))
+        super().__init__(path, chunk_size, checkpoint_file)
+        self._writer = None
+        if fieldnames is not None:
+            self._writer = csv.DictWriter(self._file, fieldnames, extrasaction='ignore')
+
+    def _write_chunk(self, chunk):
+        for site_id, measurement, timestamp, point in chunk:
+            if self._writer is None:
+                self._writer = csv.DictWriter(self._file, [SITE_ID, MEASUREMENT, *point],
+                                              extrasaction='ignore')
+                self._writer.writeheader()
+            self._writer.writerow({SITE_ID: site_id, MEASUREMENT: measurement, **point})
+        self._file.flush()
+
+
+class JsonLinesExporter(_TextExporter):
+    """Export points as JSON Lines, one object per point."""
+
+    def _write_chunk(self, chunk):
+        self._file.writelines(
+            json.dumps({SITE_ID: site_id, MEASUREMENT: measurement, **point}) + '\n'
+            for site_id, measurement, timestamp, point in chunk)
+        self._file.flush()
+
+
+def _escape_key(value):
+    return str(value).replace(',', r'\,').replace('=', r'\=').replace(' ', r'\ ')
+
+
+def _influx_field_value(value):
+    # The API reports booleans as 'True'/'False' strings.
+    if isinstance(value, bool) or value in ('True', 'False'):
+        return 'true' if value in (True, 'True') else 'false'
+    if isinstance(value, (int, float)):
+        # Always write floats; the API returns 0 for fields that are otherwise
+        # floats, which would cause field type conflicts in InfluxDB.
+        return repr(float(value))
+    return '"{}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+
+class InfluxExporter(_TextExporter):
+    """Export points in InfluxDB line protocol.
+
+    The measurement is the history kind (or live_status), the site id is written
+    as a tag and the timestamp in nanosecond precision.
+    """
+
+    def _write_chunk(self, chunk):
+        for site_id, measurement, timestamp, point in chunk:
+            fields = ','.join(
+                '{}={}'.format(_escape_key(name), _influx_field_value(value))
+                for name, value in point.items()
+                if name != LiveStatus.TIMESTAMP.value and value is not None)
+            if not fields:
+                continue
+            self._file.write('{},{}={} {} {}\n'.format(
+                _escape_key(measurement), SITE_ID, _escape_key(site_id), fields,
+                int(timestamp.timestamp()) * 1000000000))
+        self._file.flush()
+
+
+class ParquetExporter(Exporter):
+    """Export points to a Parquet file, one row group per chunk.
+
+    Requires pyarrow. Parquet files cannot be appended to, so each export creates
+    a new file; use a checkpoint_file and a new path to export incrementally.
+
+    The timestamp is stored as a UTC timestamp, numbers as float64 and other values
+    as strings. The fields and their types are taken from the first chunk written,
+    unless fields is provided as a dict of field name to 'float' or 'string'. A
+    Parquet file has a single schema, so fields that first appear in a later chunk
+    are dropped with a warning, and values that cannot be converted to the type of
+    their field are written as null.
+    """
+
+    def __init__(self, path, chunk_size=10000, checkpoint_file=None, fields=None):
+        if pyarrow is None:
+            raise ImportError('ParquetExporter requires pyarrow to be installed')
+        super().__init__(path, chunk_size, checkpoint_file)
+        self._fields = fields
+        self._writer = None
+        self._dropped = set()
+
+    @staticmethod
+    def _convert(value, field_type):
+        if value is None:
+            return None
+        if field_type == 'string':
+            return str(value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _create_writer(self, chunk):
+        if self._fields is None:
+            # Fields are numbers unless a value in the chunk says otherwise, which
+            # includes fields that are null throughout the chunk.
+            self._fields = {}
+            for _, _, _, point in chunk:
+                for name, value in point.items():
+                    if name == LiveStatus.TIMESTAMP.value:
+                        continue
+                    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                        self._fields[name] = 'string'
+                    else:
+                        self._fields.setdefault(name, 'float')
+
+        schema = pyarrow.schema(
+            [(SITE_ID, pyarrow.string()), (MEASUREMENT, pyarrow.string()),
+             (LiveStatus.TIMESTAMP.value, pyarrow.timestamp('us', tz='UTC'))] +
+            [(name, pyarrow.float64() if field_type == 'float' else pyarrow.string())
+             for name, field_type in self._fields.items()])
+        self._writer = pyarrow.parquet.ParquetWriter(self._path, schema)
+
+    def _write_chunk(self, chunk):
+        if self._writer is None:
+            self._create_writer(chunk)
+
+        for _, _, _, point in chunk:
+            for name in point:
+                if (name not in self._fields and name != LiveStatus.TIMESTAMP.value and
+                        name not in self._dropped):
+                    self._dropped.add(name)
+                    _LOGGER.warning('Dropping field %s, which is not in the schema of %s', name, self._path)
+
+        columns = {
+            SITE_ID: [str(site_id) for site_id, _, _, _ in chunk],
+            MEASUREMENT: [measurement for _, measurement, _, _ in chunk],
+            LiveStatus.TIMESTAMP.value: [timestamp for _, _, timestamp, _ in chunk],
+        }
+        for name, field_type in self._fields.items():
+            columns[name] = [self._convert(point.get(name), field_type) for _, _, _, point in chunk]
+        self._writer.write_table(pyarrow.table(columns, schema=self._writer.schema))
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def export_calendar_history(energy_sites, exporter, kind=HistoryType.ENERGY.value,
+                                  period=HistoryPeriod.DAY.value, end_date=None):
+    """Export calendar history of a number of energy sites.
+
+    Requests are made with the BACKGROUND priority. Sites are fetched one at a
+    time and each response is parsed as it arrives, so
+    memory use is bounded by the exporter's chunk size regardless of the period or
+    number of sites. Points already exported according to the exporter's
+    checkpoint are skipped.
+
+    Args:
+        energy_sites: Iterable of Energy objects.
+        exporter: The Exporter to write the points to.
+        kind, period, end_date: See Energy.get_energy_site_calendar_history_data().
+
+    Returns:
+        The number of points written.
+    """
+    count = 0
+    with use_priority(RequestPriority.BACKGROUND):
+        for energy_site in energy_sites:
+            async for point in energy_site.iter_energy_site_calendar_history_data(kind, period, end_date):
+                count += exporter.write(energy_site.site_id, kind, point)
+    exporter.flush()
+    return count
+
+
+async def export_live_status(energy_sites, exporter, interval=60, samples=None):
+    """Poll the live status of a number of energy sites and export it.
+
+    Args:
+        energy_sites: Iterable of Energy objects.
+        exporter: The Exporter to write the points to.
+        interval: Seconds between polls.
+        samples: Number of times to poll every site. Set to None to run until
+            cancelled.
+
+    Returns:
+        The number of points written.
+    """
+    energy_sites = list(energy_sites)
+    count = 0
+    sample = 0
+    while samples is None or sample < samples:
+        with use_priority(RequestPriority.BACKGROUND):
+            for energy_site in energy_sites:
+                status = await energy_site.get_energy_site_live_status()
+                count += exporter.write(energy_site.site_id, TESLA_API_URL_LIVE_STATUS, status)
+        exporter.flush()
+        sample += 1
+        if samples is None or sample < samples:
+            await asyncio.sleep(interval)
+    return count
@@ -0,0 +1,116 @@
+import asyncio
+import re
+from collections import deque
+
+
+def endpoint_key(endpoint):
+    """Return the endpoint with ids replaced, so latencies are tracked per kind of request."""
+    return re.sub(r'/\d+(?=/|$)', '/{id}', endpoint)
+
+
+def _retrieve_exception(task):
+    # Failed attempts whose response was not used would otherwise be logged as
+    # "exception was never retrieved".
+    if not task.cancelled():
+        task.exception()
+
+
+class LatencyTracker:
+    """Tracks a percentile of the latency of recent requests per endpoint.
+
+    Args:
+        window: Number of recent latencies to keep per endpoint.
+        percentile: The percentile returned by threshold(), between 0 and 1.
+        min_samples: Number of latencies needed before threshold() returns a value.
+    """
+
+    def __init__(self, window=200, percentile=0.95, min_samples=20):
+        self._window = window
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._latencies = {}
+
+    def record(self, key, latency):
+        latencies = self._latencies.get(key)
+        if latencies is None:
+            latencies = self._latencies[key] = deque(maxlen=self._window)
+        latencies.append(latency)
+
+    def threshold(self, key):
+        latencies = self._latencies.get(key)
+        if latencies is None or len(latencies) < self._min_samples:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(int(len(ordered) * self._percentile), len(ordered) - 1)]
+
+
+class Hedger:
+    """Sends a duplicate of slow requests and uses whichever response comes first.
+
+    If a request has not completed within the tracked percentile latency of its
+    endpoint, one duplicate is sent and the first successful response is used; the
+    other request is cancelled. Until enough latencies have been recorded for an
+    endpoint, its requests are not hedged.
+
+    The number of hedges is limited by a budget: every request adds ratio to it,
+    up to burst, and every hedge uses one. With the default ratio, at most 5% of
+    requests are duplicated over time.
+
+    Only use this for requests that are safe to repeat, i.e. reads.
+    """
+
+    def __init__(self, ratio=0.05, burst=10, tracker=None):
+        self.ratio = ratio
+        self._burst = burst
+        self._budget = burst
+        self.tracker = tracker or LatencyTracker()
+        self.requests = 0
+        self.hedged = 0
+
+    async def _timed(self, key, request, original):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        completed = False
+        try:
+            result = await request()
+            completed = True
+            return result
+        finally:
+            # A cancelled or failed original is recorded too, as a lower bound of its
+            # latency; leaving out the slowest requests would bias the percentile
+            # low. A losing duplicate is not, as it only ran for part of the request.
+            if original or completed:
+                self.tracker.record(key, loop.time() - start)
+
+    def _start(self, key, request, original):
+        task = asyncio.ensure_future(self._timed(key, request, original))
+        task.add_done_callback(_retrieve_exception)
+        return task
+
+    async def request(self, key, request):
+        """Run request, a coroutine function, hedging it if it is slow."""
+        self.requests += 1
+        self._budget = min(self._burst, self._budget + self.ratio)
+        threshold = self.tracker.threshold(key)
+
+        tasks = [self._start(key, request, True)]
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait(tasks, timeout=threshold)
+                if not done and self._budget >= 1:
+                    self._budget -= 1
+                    self.hedged += 1
+                    tasks.append(self._start(key, request, False))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Every attempt failed, so raise the error of the original request.
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
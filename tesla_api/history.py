@@ -0,0 +1,95 @@
+import asyncio
+import json
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .const import HistoryData, PowerTimeSeries
+from .utils import parse_timestamp
+
+
+def _to_float(value):
+    # The API reports booleans as 'True'/'False' strings. Other values that are not
+    # numbers, such as grid_status 'Active', cannot be stored in array('d').
+    if value in (True, 'True'):
+        return 1.0
+    if value in (False, 'False'):
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_history(body):
+    """Decode a calendar_history response body into compact arrays.
+
+    The time_series list of dicts is converted to a dict of columns: 'timestamp'
+    holds the seconds since the epoch as array('q') and every other field is an
+    array('d'), with NaN for points that are missing the field. Booleans are
+    stored as 1 and 0 and other values that are not numbers as NaN. Points without
+    a valid timestamp are skipped. The other keys of the response are returned
+    unchanged.
+
+    This is a module level function so it can be run in a ProcessPoolExecutor.
+    """
+    response = json.loads(body)
+    response = response.get('response', response)
+    time_series = response.pop(HistoryData.TIME_SERIES.value, [])
+
+    timestamps = array('q')
+    columns = {PowerTimeSeries.TIMESTAMP.value: timestamps}
+    for point in time_series:
+        try:
+            timestamp = int(parse_timestamp(point[PowerTimeSeries.TIMESTAMP.value]).timestamp())
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        index = len(timestamps)
+        timestamps.append(timestamp)
+        for name, value in point.items():
+            if name == PowerTimeSeries.TIMESTAMP.value:
+                continue
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = array('d', [math.nan]) * index
+            column.append(_to_float(value))
+        for column in columns.values():
+            if len(column) <= index:
+                column.append(math.nan)
+
+    response[HistoryData.TIME_SERIES.value] = columns
+    return response
+
+
+class HistoryParser:
+    """Parses calendar_history bodies, optionally in a pool of worker processes.
+
+    Decoding and normalizing large history responses is CPU bound, so during
+    backfills of many sites it keeps the event loop busy. With workers set, bodies
+    of at least min_size bytes are parsed in a process pool instead, which leaves
+    the event loop free for I/O and spreads the work across cores. Smaller bodies
+    are parsed in-process, as sending them to a worker costs more than it saves.
+
+    Args:
+        workers: Number of worker processes. Set to 0 to always parse in-process,
+            or None to use one worker per CPU.
+        min_size: Minimum body size in bytes to parse in the process pool.
+    """
+
+    def __init__(self, workers=0, min_size=262144):
+        self._workers = workers
+        self._min_size = min_size
+        self._executor = None
+
+    async def parse(self, body):
+        if self._workers == 0 or len(body) < self._min_size:
+            return parse_history(body)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self._workers)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, parse_history, body)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import logging
+import random
+
+from .const import RequestPriority
+from .exceptions import VehicleUnavailableError
+from .scheduler import use_priority
+
+_LOGGER = logging.getLogger(__name__)
+
+DRIVING_SHIFT_STATES = ('D', 'R', 'N')
+CHARGING_STATES = ('Charging', 'Starting')
+
+
+def is_active(data):
+    """Return True if vehicle_data shows the vehicle is driving or charging."""
+    drive_state = data.get('drive_state') or {}
+    charge_state = data.get('charge_state') or {}
+    return (drive_state.get('shift_state') in DRIVING_SHIFT_STATES or
+            charge_state.get('charging_state') in CHARGING_STATES)
+
+
+class _PollState:
+    def __init__(self, vehicle):
+        self.vehicle = vehicle
+        self.interval = None
+        self.idle_since = None  # Loop time since which the vehicle is parked and not charging.
+        self.quiet_until = None  # Loop time until which vehicle_data is not requested.
+
+
+class VehiclePoller:
+    """Polls a fleet of vehicles while letting idle vehicles fall asleep.
+
+    Every poll uses the cheap vehicles/{id} endpoint (Vehicle.update()), which does
+    not wake the vehicle. vehicle_data is only requested when the vehicle is
+    online, and on_data is then awaited with the vehicle and the data. Polls do not
+    wait for on_data, but a vehicle is not polled again until it has returned;
+    exceptions raised by on_data are logged and counted in errors.
+
+    The interval until the next poll depends on what the vehicle is doing:
+    active_interval while driving or charging, idle_interval while online and
+    parked, and asleep_interval while asleep or offline. A vehicle that has been
+    parked for idle_timeout seconds is only polled with update() for the next
+    sleep_window seconds, as requesting vehicle_data keeps it awake.
+
+    Requests are made with the BACKGROUND priority, so they do not delay
+    commands. Polls are spread evenly over the idle interval at startup, randomized by
+    jitter, and at most concurrency polls run at the same time, so requests do
+    not arrive in bursts.
+    """
+
+    def __init__(self, vehicles, on_data=None, active_interval=30, idle_interval=120,
+                 asleep_interval=300, idle_timeout=600, sleep_window=900, concurrency=4,
+                 jitter=0.1):
+        self._states = [_PollState(vehicle) for vehicle in vehicles]
+        self._on_data = on_data
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.asleep_interval = asleep_interval
+        self.idle_timeout = idle_timeout
+        self.sleep_window = sleep_window
+        self._concurrency = concurrency
+        self._jitter = jitter
+        self._queue = []
+        self._counter = 0
+        self._wakeup = None
+        self.errors = 0
+
+    async def _poll(self, state):
+        # Returns the interval until the vehicle should be polled again, and the
+        # vehicle_data if it was requested.
+        vehicle = state.vehicle
+        loop = asyncio.get_running_loop()
+
+        await vehicle.update()
+        if vehicle.state != 'online':
+            state.idle_since = state.quiet_until = None
+            return self.asleep_interval, None
+
+        now = loop.time()
+        if state.quiet_until is not None:
+            if now < state.quiet_until:
+                return self.idle_interval, None
+            # Still awake after the sleep window, so resume requesting data.
+            state.quiet_until = None
+
+        try:
+            data = await vehicle.get_data()
+        except VehicleUnavailableError:
+            # Fell asleep since update().
+            return self.asleep_interval, None
+
+        if is_active(data):
+            state.idle_since = None
+            return self.active_interval, data
+
+        if state.idle_since is None:
+            state.idle_since = now
+        elif now - state.idle_since >= self.idle_timeout:
+            state.idle_since = None
+            state.quiet_until = now + self.sleep_window
+        return self.idle_interval, data
+
+    def _schedule(self, state, due):
+        self._counter += 1
+        heapq.heappush(self._queue, (due, self._counter, state))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run_poll(self, state, semaphore):
+        loop = asyncio.get_running_loop()
+        data = None
+        try:
+            with use_priority(RequestPriority.BACKGROUND):
+                state.interval, data = await self._poll(state)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors += 1
+            _LOGGER.exception('Polling vehicle %s failed', state.vehicle.id)
+            state.interval = self.idle_interval
+        finally:
+            semaphore.release()
+
+        if data is not None and self._on_data is not None:
+            try:
+                await self._on_data(state.vehicle, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                _LOGGER.exception('Handling data of vehicle %s failed', state.vehicle.id)
+
+        interval = state.interval * random.uniform(1 - self._jitter, 1 + self._jitter)
+        self._schedule(state, loop.time() + interval)
+
+    async def run(self):
+        """Poll the vehicles until cancelled."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self._concurrency)
+        self._wakeup = asyncio.Event()
+        tasks = set()
+
+        now = loop.time()
+        for index, state in enumerate(self._states):
+            self._schedule(state, now + index * self.idle_interval / max(len(self._states), 1))
+
+        try:
+            while True:
+                delay = self._queue[0][0] - loop.time() if self._queue else None
+                if delay is None or delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                _, _, state = heapq.heappop(self._queue)
+                await semaphore.acquire()
+                task = asyncio.create_task(self._run_poll(state, semaphore))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._queue = []
+            self._wakeup = None
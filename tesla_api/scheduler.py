@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import heapq
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+
+from .const import RequestPriority
+from .exceptions import RequestPreemptedError
+
+DEFAULT_LIMITS = {
+    RequestPriority.INTERACTIVE: 4,
+    RequestPriority.TOKEN_REFRESH: 1,
+    RequestPriority.FOREGROUND: 8,
+    RequestPriority.BACKGROUND: 4,
+}
+
+# Classes that are only limited by their own limit, not by max_concurrency.
+_UNSHARED = (RequestPriority.INTERACTIVE, RequestPriority.TOKEN_REFRESH)
+
+request_priority = contextvars.ContextVar('request_priority', default=None)
+
+
+@contextmanager
+def use_priority(priority):
+    """Run requests made in this block, and tasks created from it, with the given priority."""
+    token = request_priority.set(priority)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class RequestScheduler:
+    """Orders requests by RequestPriority with bounded concurrency per class.
+
+    Every priority class has its own concurrency limit, and all classes but
+    INTERACTIVE and TOKEN_REFRESH share max_concurrency, so interactive requests
+    and the token refreshes they may need never wait for polling. When a request
+    finishes, the highest priority queued request that is within its limits is
+    started next.
+
+    Args:
+        max_concurrency: Maximum number of concurrent FOREGROUND and BACKGROUND
+            requests.
+        limits: Dict of RequestPriority to concurrency limit, overriding DEFAULT_LIMITS.
+    """
+
+    def __init__(self, max_concurrency=10, limits=None):
+        self._max_concurrency = max_concurrency
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self._active = Counter()
+        self._waiters = []  # Heap of (priority, sequence, future).
+        self._counter = 0
+
+    def _can_start(self, priority):
+        if self._active[priority] >= self.limits[priority]:
+            return False
+        if priority in _UNSHARED:
+            return True
+        shared = sum(self._active.values()) - sum(self._active[unshared] for unshared in _UNSHARED)
+        return shared < self._max_concurrency
+
+    async def acquire(self, priority):
+        # Requests of the same or a higher priority that are already queued go first.
+        if self._can_start(priority) and not any(
+                waiter[0] <= priority and not waiter[2].done() for waiter in self._waiters):
+            self._active[priority] += 1
+            return
+
+        self._counter += 1
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, self._counter, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just before being cancelled.
+                self.release(priority)
+            raise
+
+    def release(self, priority):
+        self._active[priority] -= 1
+        self._start_waiters()
+
+    def _start_waiters(self):
+        waiters = []
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            priority, _, future = waiter
+            if future.done():
+                continue
+            if self._can_start(priority):
+                self._active[priority] += 1
+                future.set_result(None)
+            else:
+                waiters.append(waiter)
+        for waiter in waiters:
+            heapq.heappush(self._waiters, waiter)
+
+    @asynccontextmanager
+    async def slot(self, priority):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def preempt(self, priority=RequestPriority.BACKGROUND):
+        """Fail all queued requests of the given or a lower priority.
+
+        Requests that have already started are not affected. The preempted
+        requests raise RequestPreemptedError.
+
+        Returns:
+            The number of preempted requests.
+        """
+        count = 0
+        waiters = []
+        for waiter in self._waiters:
+            if waiter[0] >= priority and not waiter[2].done():
+                waiter[2].set_exception(RequestPreemptedError())
+                count += 1
+            else:
+                waiters.append(waiter)
+        heapq.heapify(waiters)
+        self._waiters = waiters
+        return count
+
+    @property
+    def queued(self):
+        """Number of queued requests per priority."""
+        return Counter(waiter[0] for waiter in self._waiters if not waiter[2].done())
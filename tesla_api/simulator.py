@@ -0,0 +1,471 @@
+"""Load simulation of the client against an in-process fake owner-api.
+
+Drives TeslaApiClient, Vehicle and Energy with a fleet workload (VehiclePoller,
+interactive commands, live status reads and a calendar history export) and reports
+throughput, latency percentiles, memory growth, task counts and request
+amplification. For example:
+
+    python -m tesla_api.simulator --scenario all --vehicles 1000 --energy-sites 300
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from . import TeslaApiClient
+from .const import (
+    HistoryType,
+    TESLA_API_OAUTH2_URL,
+    TESLA_API_TOKEN_URL,
+    TESLA_API_URL,
+)
+from .export import JsonLinesExporter, export_calendar_history
+from .polling import VehiclePoller
+
+SCENARIOS = {
+    'baseline': {},
+    'throttled': {'api_options': {'rate_limit': 100}},
+    'slow_api': {'api_options': {'latency': 0.2, 'slow_probability': 0.05}},
+    'token_churn': {'api_options': {'token_lifetime': 5}},
+    'sleepy_fleet': {'api_options': {'sleep_after': 3, 'wake_delay': 5}},
+}
+
+# Intervals of VehiclePoller scaled down so a short simulation covers the whole
+# idle/sleep cycle.
+DEFAULT_POLLER_OPTIONS = {
+    'active_interval': 2,
+    'idle_interval': 5,
+    'asleep_interval': 15,
+    'idle_timeout': 10,
+    'sleep_window': 15,
+    'concurrency': 16,
+}
+
+
+def _timestamp(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class _Samples:
+    """Keeps a uniform sample of at most size values for percentiles."""
+
+    def __init__(self, size=10000):
+        self._size = size
+        self._values = []
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if len(self._values) < self._size:
+            self._values.append(value)
+        else:
+            index = random.randrange(self.count)
+            if index < self._size:
+                self._values[index] = value
+
+    def summary(self):
+        if not self._values:
+            return {'count': 0}
+        ordered = sorted(self._values)
+
+        def percentile(fraction):
+            return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 4)
+        return {'count': self.count, 'p50': percentile(0.5), 'p95': percentile(0.95),
+                'p99': percentile(0.99), 'max': round(ordered[-1], 4)}
+
+
+class _FakeVehicle:
+    def __init__(self, vehicle_id, api, now):
+        self.id = vehicle_id
+        self.vin = '5YJ3E1EA{:09d}'.format(vehicle_id)
+        self.state = 'online' if random.random() < 0.3 else 'asleep'
+        self.awake_until = now + api.sleep_after
+        self.wake_at = None
+        self.active_until = 0
+        self.charging = False
+        self.last_tick = now
+
+    def tick(self, api, now):
+        elapsed = now - self.last_tick
+        self.last_tick = now
+        if self.state == 'waking' and now >= self.wake_at:
+            self.state = 'online'
+            self.awake_until = now + api.sleep_after
+        if now >= self.active_until and random.random() < 1 - math.exp(-api.activity_rate * elapsed):
+            # Start driving or charging, which wakes the vehicle.
+            self.active_until = now + api.activity_duration
+            self.charging = random.random() < 0.5
+            self.state = 'online'
+            self.awake_until = now + api.sleep_after
+        if self.state == 'online' and now >= max(self.awake_until, self.active_until):
+            self.state = 'asleep'
+
+    def summary(self):
+        # The API reports vehicles that are waking up as asleep.
+        state = 'asleep' if self.state == 'waking' else self.state
+        return {'id': self.id, 'vehicle_id': self.id, 'vin': self.vin, 'state': state,
+                'display_name': 'Vehicle {}'.format(self.id), 'in_service': False}
+
+    def data(self, now):
+        active = now < self.active_until
+        driving = active and not self.charging
+        data = self.summary()
+        data.update({
+            'drive_state': {'shift_state': 'D' if driving else None, 'speed': 50 if driving else None,
+                            'latitude': 51.5, 'longitude': -0.1, 'heading': 90, 'power': 20 if driving else 0},
+            'charge_state': {'charging_state': 'Charging' if active and self.charging else 'Disconnected',
+                             'battery_level': 60, 'charge_limit_soc': 80, 'charger_power': 11 if active else 0},
+            'climate_state': {'inside_temp': 20.5, 'outside_temp': 12.0, 'is_climate_on': False},
+            'vehicle_state': {'locked': True, 'odometer': 12345.6, 'sentry_mode': False},
+            'gui_settings': {'gui_distance_units': 'km/hr', 'gui_temperature_units': 'C'},
+        })
+        return data
+
+
+class FakeOwnerApi:
+    """In-process fake of the owner-api endpoints used by the client.
+
+    Vehicles fall asleep sleep_after seconds after the last vehicle_data request
+    or command, take wake_delay seconds to wake up, and randomly start driving or
+    charging at activity_rate per second. Latency follows a log-normal distribution
+    around latency, with slow_probability of an extra slow_latency. With rate_limit
+    set, requests beyond that many per second are rejected with 429.
+
+    Counts of requests, wake ups, token refreshes, throttled and unavailable
+    responses are kept in stats.
+    """
+
+    def __init__(self, vehicles=1000, energy_sites=300, latency=0.05, latency_sigma=0.5,
+                 slow_probability=0.01, slow_latency=2, rate_limit=None, sleep_after=10,
+                 wake_delay=3, activity_rate=0.01, activity_duration=20, token_lifetime=3600,
+                 history_points=288):
+        now = time.monotonic()
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.slow_probability = slow_probability
+        self.slow_latency = slow_latency
+        self.rate_limit = rate_limit
+        self.sleep_after = sleep_after
+        self.wake_delay = wake_delay
+        self.activity_rate = activity_rate
+        self.activity_duration = activity_duration
+        self.token_lifetime = token_lifetime
+        self.history_points = history_points
+        self.vehicles = {vehicle_id: _FakeVehicle(vehicle_id, self, now)
+                         for vehicle_id in range(1, vehicles + 1)}
+        self.energy_site_ids = list(range(100001, 100001 + energy_sites))
+        self.stats = Counter()
+        self.latencies = _Samples()
+        self._allowance = rate_limit
+        self._allowance_time = now
+
+    def token(self):
+        """Return a token for TeslaApiClient that needs refreshing after token_lifetime seconds."""
+        return {
+            'access_token': 'simulated',
+            'token_type': 'bearer',
+            # The client refreshes tokens with less than an hour left.
+            'expires_in': 3600 + self.token_lifetime,
+            'created_at': int(time.time()),
+        }
+
+    def _throttled(self, now):
+        if self.rate_limit is None:
+            return False
+        self._allowance = min(self.rate_limit,
+                              self._allowance + (now - self._allowance_time) * self.rate_limit)
+        self._allowance_time = now
+        if self._allowance < 1:
+            return True
+        self._allowance -= 1
+        return False
+
+    async def handle(self, method, url, params, data):
+        self.stats['requests'] += 1
+        latency = random.lognormvariate(math.log(self.latency), self.latency_sigma)
+        if random.random() < self.slow_probability:
+            latency += self.slow_latency
+        await asyncio.sleep(latency)
+        self.latencies.add(latency)
+
+        if self._throttled(time.monotonic()):
+            self.stats['throttled'] += 1
+            return _FakeResponse(429, {'error': 'rate limited'})
+
+        if url == TESLA_API_OAUTH2_URL:
+            return _FakeResponse(200, {'access_token': 'simulated'})
+        if url == TESLA_API_TOKEN_URL:
+            self.stats['token_refreshes'] += 1
+            return _FakeResponse(200, self.token())
+
+        status, response = self._route(method, url[len(TESLA_API_URL) + 1:].split('/'), params)
+        return _FakeResponse(status, response)
+
+    def _route(self, method, path, params):
+        now = time.monotonic()
+        if path == ['vehicles']:
+            for vehicle in self.vehicles.values():
+                vehicle.tick(self, now)
+            return 200, {'response': [vehicle.summary() for vehicle in self.vehicles.values()],
+                         'count': len(self.vehicles)}
+        if path == ['products']:
+            return 200, {'response': [{'energy_site_id': site_id, 'resource_type': 'battery'}
+                                      for site_id in self.energy_site_ids],
+                         'count': len(self.energy_site_ids)}
+
+        if path[0] == 'vehicles' and int(path[1]) in self.vehicles:
+            vehicle = self.vehicles[int(path[1])]
+            vehicle.tick(self, now)
+            if len(path) == 2:
+                return 200, {'response': vehicle.summary()}
+            if path[2] == 'wake_up':
+                self.stats['wake_ups'] += 1
+                if vehicle.state == 'asleep':
+                    vehicle.state = 'waking'
+                    vehicle.wake_at = now + self.wake_delay
+                return 200, {'response': vehicle.summary()}
+            if vehicle.state != 'online':
+                self.stats['unavailable'] += 1
+                if path[2] == 'command':
+                    self.stats['command_retries'] += 1
+                return 408, {'response': None, 'error': 'vehicle unavailable: {}'.format(vehicle.state)}
+            # Requesting data or sending commands keeps the vehicle awake.
+            vehicle.awake_until = now + self.sleep_after
+            if path[2] == 'command':
+                self.stats['commands'] += 1
+                return 200, {'response': {'result': True, 'reason': ''}}
+            self.stats['vehicle_data'] += 1
+            data = vehicle.data(now)
+            if path[2] == 'data_request':
+                data = data.get(path[3], {})
+            return 200, {'response': data}
+
+        if path[0] == 'energy_sites' and int(path[1]) in self.energy_site_ids and len(path) == 3:
+            moment = datetime.now(timezone.utc)
+            if path[2] == 'live_status':
+                return 200, {'response': {
+                    'solar_power': random.uniform(0, 4000), 'energy_left': 9000.0,
+                    'total_pack_energy': 13718, 'percentage_charged': 65.0, 'backup_capable': 'True',
+                    'battery_power': random.uniform(-3000, 3000), 'load_power': random.uniform(200, 3000),
+                    'grid_status': 'Active', 'grid_services_active': 'False', 'grid_power': 0,
+                    'grid_services_power': 0, 'generator_power': 0, 'storm_mode_active': 'False',
+                    'timestamp': _timestamp(moment)}}
+            if path[2] == 'calendar_history':
+                self.stats['calendar_history'] += 1
+                return 200, {'response': {
+                    'serial_number': 'SIM-{}'.format(path[1]),
+                    'period': (params or {}).get('period'),
+                    'installation_time_zone': 'Europe/London',
+                    'time_series': [
+                        {'timestamp': _timestamp(moment - timedelta(minutes=5 * index)),
+                         'solar_power': random.uniform(0, 4000), 'battery_power': random.uniform(-3000, 3000),
+                         'grid_power': random.uniform(-1000, 3000), 'grid_services_power': 0,
+                         'generator_power': 0}
+                        for index in range(self.history_points, 0, -1)]}}
+            if method == 'POST':
+                return 200, {'response': {'code': 201, 'message': 'Updated'}}
+
+        return 404, {'response': None, 'error': 'not_found'}
+
+
+class _FakeContent:
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start:start + size]
+
+
+class _FakeResponse:
+    def __init__(self, status, response):
+        self.status = status
+        self.reason = 'OK' if status == 200 else 'Error'
+        self._body = json.dumps(response).encode()
+        self.content = _FakeContent(self._body)
+
+    async def json(self):
+        return json.loads(self._body)
+
+    async def read(self):
+        return self._body
+
+
+class _FakeRequest:
+    def __init__(self, api, method, url, params, data):
+        self._api = api
+        self._args = (method, url, params, data)
+
+    async def __aenter__(self):
+        return await self._api.handle(*self._args)
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class FakeSession:
+    """Stand-in for aiohttp.ClientSession which sends requests to a FakeOwnerApi."""
+
+    def __init__(self, api):
+        self._api = api
+
+    def get(self, url, headers=None, params=None, **kwargs):
+        return _FakeRequest(self._api, 'GET', url, params, None)
+
+    def post(self, url, headers=None, json=None, **kwargs):
+        return _FakeRequest(self._api, 'POST', url, None, json)
+
+    async def close(self):
+        pass
+
+
+async def simulate(duration=30, vehicles=1000, energy_sites=300, command_rate=2, command_timeout=30,
+                   live_status_interval=10, hedge=True, api_options=None, poller_options=None,
+                   scheduler_limits=None, trace_memory=True):
+    """Run a fleet workload against a FakeOwnerApi for duration seconds.
+
+    The workload consists of a VehiclePoller over all vehicles, flash_lights
+    commands on random vehicles at command_rate per second, reading the live
+    status of every energy site every live_status_interval seconds and a single
+    export of the power history of all energy sites.
+
+    Returns:
+        A dict with the report.
+    """
+    api = FakeOwnerApi(vehicles=vehicles, energy_sites=energy_sites, **(api_options or {}))
+    if trace_memory:
+        tracemalloc.start()
+    loop = asyncio.get_running_loop()
+    token = {'authentication_token': api.token(), 'oauth_token': {'refresh_token': 'simulated'}}
+    client = TeslaApiClient(json.dumps(token), session=FakeSession(api))
+    client.scheduler.limits.update(scheduler_limits or {})
+    latencies = {'command': _Samples(), 'live_status': _Samples(), 'history_export': _Samples()}
+    errors = Counter()
+    samples = {'tasks': [], 'memory': []}
+
+    async def timed(kind, coro):
+        start = loop.time()
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            errors[type(error).__name__] += 1
+        else:
+            latencies[kind].add(loop.time() - start)
+
+    async def send_command(vehicle):
+        async with client.deadline(command_timeout):
+            await vehicle.controls.flash_lights()
+
+    async def commands(fleet):
+        tasks = set()
+        try:
+            while True:
+                await asyncio.sleep(random.expovariate(command_rate))
+                task = asyncio.create_task(timed('command', send_command(random.choice(fleet))))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def live_status(sites):
+        while True:
+            await asyncio.gather(*(timed('live_status', site.get_energy_site_live_status(hedge=hedge))
+                                   for site in sites))
+            await asyncio.sleep(live_status_interval)
+
+    async def history_export(sites):
+        with JsonLinesExporter(os.devnull) as exporter:
+            await timed('history_export', export_calendar_history(sites, exporter, kind=HistoryType.POWER.value))
+
+    async def sample():
+        while True:
+            samples['tasks'].append(len(asyncio.all_tasks()))
+            if trace_memory:
+                samples['memory'].append(tracemalloc.get_traced_memory()[0])
+            await asyncio.sleep(0.5)
+
+    start = loop.time()
+    memory_start = tracemalloc.get_traced_memory()[0] if trace_memory else None
+    fleet = await client.list_vehicles()
+    sites = await client.list_energy_sites()
+    poller = VehiclePoller(fleet, **dict(DEFAULT_POLLER_OPTIONS, **(poller_options or {})))
+    workloads = [poller.run(), commands(fleet), live_status(sites), history_export(sites), sample()]
+    tasks = [asyncio.create_task(workload) for workload in workloads]
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = loop.time() - start
+    tasks_end = len(asyncio.all_tasks())
+    await client.close()
+
+    report = {
+        'duration': round(elapsed, 2),
+        'vehicles': vehicles,
+        'energy_sites': energy_sites,
+        'requests': api.stats['requests'],
+        'throughput': round(api.stats['requests'] / elapsed, 1),
+        'latency': {kind: values.summary() for kind, values in latencies.items()},
+        'api_latency': api.latencies.summary(),
+        'tasks': {'max': max(samples['tasks'], default=0), 'end': tasks_end},
+        'amplification': {
+            'wake_ups': api.stats['wake_ups'],
+            'wake_ups_per_command': round(api.stats['wake_ups'] / max(latencies['command'].count, 1), 2),
+            'command_retries': api.stats['command_retries'],
+            'token_refreshes': api.stats['token_refreshes'],
+            'hedged_requests': client.hedger.hedged,
+            'vehicle_data': api.stats['vehicle_data'],
+            'unavailable': api.stats['unavailable'],
+            'throttled': api.stats['throttled'],
+        },
+        'errors': dict(errors),
+        'poll_errors': poller.errors,
+        'events_dropped': client.events.dropped,
+    }
+    if trace_memory:
+        memory_end, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report['memory'] = {'start': memory_start, 'end': memory_end,
+                            'growth': memory_end - memory_start, 'peak': memory_peak}
+    return report
+
+
+def getopts(argv):
+    parser = argparse.ArgumentParser(description='Simulate fleet load against a fake owner-api')
+    parser.add_argument('-s', '--scenario', action='append', choices=[*SCENARIOS, 'all'],
+                        help='Scenario to run, can be repeated. Defaults to baseline')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run each scenario')
+    parser.add_argument('--vehicles', type=int, default=1000)
+    parser.add_argument('--energy-sites', type=int, default=300)
+    parser.add_argument('--command-rate', type=float, default=2, help='Commands per second')
+    parser.add_argument('--no-memory', action='store_true', help='Do not trace memory, which is slow')
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = getopts(argv)
+    # Failed polls are counted in the report rather than logged.
+    logging.getLogger('tesla_api.polling').setLevel(logging.CRITICAL)
+    names = args.scenario or ['baseline']
+    if 'all' in names:
+        names = list(SCENARIOS)
+
+    for name in names:
+        report = await simulate(duration=args.duration, vehicles=args.vehicles,
+                                energy_sites=args.energy_sites, command_rate=args.command_rate,
+                                trace_memory=not args.no_memory, **SCENARIOS[name])
+        print(json.dumps({'scenario': name, **report}, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
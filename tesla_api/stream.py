@@ -0,0 +1,70 @@
+import codecs
+import json
+import re
+
+_WHITESPACE = ' \t\n\r'
+
+
+async def iter_json_array(chunks, key):
+    """Incrementally parse the array stored under key in a JSON document.
+
+    Elements are yielded one by one as soon as the chunks containing them have
+    arrived, so only the element being parsed is held in memory rather than the
+    whole document. Everything outside of the array is skipped. If the key does
+    not occur in the document, nothing is yielded.
+
+    Args:
+        chunks: Async iterable of bytes, e.g. aiohttp's resp.content.iter_chunked().
+        key: Name of the array, e.g. 'time_series'. The first occurrence is used.
+
+    Raises:
+        json.JSONDecodeError: The array is malformed or truncated.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    start = re.compile(r'"{}"\s*:\s*\['.format(re.escape(key)))
+    chunks = chunks.__aiter__()
+    buffer = ''
+    pos = 0
+    in_array = False
+    eof = False
+
+    while True:
+        if not in_array:
+            match = start.search(buffer)
+            if match is not None:
+                in_array = True
+                pos = match.end()
+        else:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE + ',':
+                pos += 1
+            if pos < len(buffer):
+                if buffer[pos] == ']':
+                    return
+                try:
+                    element, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # Only accept an element once the delimiter following it has
+                    # arrived, as a number may continue in the next chunk.
+                    if eof or (end < len(buffer) and buffer[end] in _WHITESPACE + ',]'):
+                        yield element
+                        pos = end
+                        continue
+            elif eof:
+                raise json.JSONDecodeError('Unterminated array', buffer, pos)
+
+        if eof:
+            return
+
+        # Drop everything that has been consumed before reading more.
+        if in_array:
+            buffer = buffer[pos:]
+            pos = 0
+        try:
+            buffer += text_decoder.decode(await chunks.__anext__())
+        except StopAsyncIteration:
+            buffer += text_decoder.decode(b'', final=True)
+            eof = True
@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp as returned by the Tesla API.
+
+    The API uses a trailing 'Z' for UTC, which datetime.fromisoformat() does not
+    accept before Python 3.11. Naive timestamps are assumed to be UTC.
+    """
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
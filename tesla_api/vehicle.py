@@ -2,6 +2,7 @@ import asyncio
 
 from .charge import Charge
 from .climate import Climate
+from .const import EventType
 from .controls import Controls
 from .exceptions import ApiError, VehicleUnavailableError
 
@@ -15,44 +16,47 @@ class Vehicle:
         self.climate = Climate(self)
         self.controls = Controls(self)
 
-    async def _command(self, command_endpoint, data=None, _retry=True):
+    async def _command(self, command_endpoint, data=None, timeout=None, _retry=True):
         """Handles vehicle commands with the common reason/result response.
 
         Args:
             command_endpoint: The final part of the endpoint (after /command/).
             data: Optional JSON data to send with the request.
+            timeout: Optional seconds to complete the command in, including waking
+                the car and retrying.
 
         Raises:
             ApiError on unsuccessful response.
+            DeadlineExceededError if the timeout expires.
         """
-        # Commands won't work if car is offline, so try and wake car first.
-        if self.state != "online":
-            await self.wake_up()
-
-        endpoint = 'vehicles/{}/command/{}'.format(self.id, command_endpoint)
-        try:
-            res = await self._api_client.post(endpoint, data)
-        except VehicleUnavailableError:
-            # If first attempt, retry with a wake up.
-            if _retry:
-                self._vehicle['state'] = 'offline'
-                return await self._command(command_endpoint, data, _retry=False)
-            raise
+        async with self._api_client.deadline(timeout):
+            # Commands won't work if car is offline, so try and wake car first.
+            if self.state != "online":
+                await self.wake_up()
+
+            endpoint = 'vehicles/{}/command/{}'.format(self.id, command_endpoint)
+            try:
+                res = await self._api_client.post(endpoint, data)
+            except VehicleUnavailableError:
+                # If first attempt, retry with a wake up.
+                if _retry:
+                    self._vehicle['state'] = 'offline'
+                    return await self._command(command_endpoint, data, _retry=False)
+                raise
 
         if res.get('result') is not True:
             raise ApiError(res.get('reason', ''))
 
-    def _update_vehicle(self, state):
+    async def _update_vehicle(self, state):
         self._vehicle = state
-        if self._api_client.callback_update is not None:
-            asyncio.create_task(self._api_client.callback_update(self))
+        await self._api_client.events.publish(EventType.UPDATE, self, key=self.id)
 
     async def is_mobile_access_enabled(self):
         return await self._api_client.get('vehicles/{}/mobile_enabled'.format(self.id))
 
     async def get_data(self):
         data = await self._api_client.get('vehicles/{}/vehicle_data'.format(self.id))
-        self._update_vehicle({k: v for k, v in data.items() if not isinstance(v, dict)})
+        await self._update_vehicle({k: v for k, v in data.items() if not isinstance(v, dict)})
         return data
 
     async def get_state(self):
@@ -75,6 +79,8 @@ class Vehicle:
 
         Raises:
             VehicleUnavailableError: Timeout exceeded without success.
+            DeadlineExceededError: The current deadline expired first, see
+                TeslaApiClient.deadline().
         """
         if timeout is None:
             delay = 2
@@ -85,14 +91,13 @@ class Vehicle:
 
         async def _wake():
             state = await self._api_client.post('vehicles/{}/wake_up'.format(self.id))
-            self._update_vehicle(state)
+            await self._update_vehicle(state)
             while self._vehicle['state'] != 'online':
                 await asyncio.sleep(delay)
                 state = await self._api_client.post('vehicles/{}/wake_up'.format(self.id))
-                self._update_vehicle(state)
+                await self._update_vehicle(state)
 
-        if self._api_client.callback_wake_up is not None:
-            asyncio.create_task(self._api_client.callback_wake_up(self))
+        await self._api_client.events.publish(EventType.WAKE_UP, self, key=self.id)
 
         try:
             await asyncio.wait_for(_wake(), timeout)
@@ -106,8 +111,12 @@ class Vehicle:
         """
         return await self._command('remote_start_drive', data={'password': password})
 
-    async def update(self):
-        self._update_vehicle(await self._api_client.get('vehicles/{}'.format(self.id)))
+    async def update(self, hedge=False):
+        """Update the vehicle's state, without waking it up.
+
+        If hedge is set, slow requests are duplicated, see TeslaApiClient.get().
+        """
+        await self._update_vehicle(await self._api_client.get('vehicles/{}'.format(self.id), hedge=hedge))
 
     def __dir__(self):
         """Include _vehicle keys in dir(), which are accessible with __getattr__()."""
@@ -0,0 +1,20 @@
+import json
+
+import pytest
+
+from tesla_api import TeslaApiClient
+from tesla_api.simulator import FakeOwnerApi, FakeSession
+
+
+@pytest.fixture
+def api():
+    return FakeOwnerApi(vehicles=3, energy_sites=2, latency=0.001, latency_sigma=0.1,
+                        slow_probability=0, activity_rate=0)
+
+
+@pytest.fixture
+def make_client(api):
+    def make_client(**kwargs):
+        token = {'authentication_token': api.token(), 'oauth_token': {'refresh_token': 'simulated'}}
+        return TeslaApiClient(json.dumps(token), session=FakeSession(api), **kwargs)
+    return make_client
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from tesla_api.const import EventType
+from tesla_api.deadline import Deadline, remaining
+from tesla_api.exceptions import DeadlineExceededError
+
+
+def test_deadline_cancels_block():
+    async def main():
+        with pytest.raises(DeadlineExceededError):
+            async with Deadline(0.05):
+                await asyncio.sleep(1)
+
+    asyncio.run(main())
+
+
+def test_nested_deadline_cannot_extend_outer():
+    async def main():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(DeadlineExceededError):
+            async with Deadline(0.05):
+                async with Deadline(10):
+                    await asyncio.sleep(1)
+        assert loop.time() - start < 0.5
+
+    asyncio.run(main())
+
+
+def test_deadline_in_task_created_within_other_deadline():
+    async def child():
+        assert remaining() is None
+        async with Deadline(0.1):
+            await asyncio.sleep(1)
+
+    async def main():
+        async with Deadline(0.05):
+            task = asyncio.create_task(child())
+        with pytest.raises(DeadlineExceededError):
+            await asyncio.wait_for(task, 0.5)
+
+    asyncio.run(main())
+
+
+def test_get_timeout_in_event_handler(make_client):
+    async def main():
+        client = make_client()
+        vehicle = (await client.list_vehicles())[0]
+        handled = asyncio.Event()
+        errors = []
+
+        async def on_update(_):
+            try:
+                async with client.deadline(0.2):
+                    await asyncio.sleep(1)
+            except DeadlineExceededError as error:
+                errors.append(error)
+            handled.set()
+
+        client.events.add_handler(EventType.UPDATE, on_update)
+        # The dispatcher's workers are started by the first event, published here
+        # within a shorter deadline which has long expired when the handler runs.
+        async with client.deadline(0.1):
+            await vehicle.update()
+        await asyncio.wait_for(handled.wait(), 0.6)
+        assert len(errors) == 1
+        await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import asyncio
+
+from tesla_api.simulator import _FakeVehicle
+
+
+def test_get_vehicle_refreshes_cached_listing(api, make_client):
+    async def main():
+        client = make_client()
+        client.discovery_min_age = 0
+        vehicles = await client.list_vehicles()
+        api.vehicles[99] = _FakeVehicle(99, api, 0)
+        removed = api.vehicles.pop(vehicles[0].id)
+
+        vehicle = await client.get_vehicle(99)
+        assert vehicle is not None and vehicle.id == 99
+        assert await client.get_vehicle(removed.id) is None
+        # Vehicles still on the account keep their object.
+        assert await client.get_vehicle(vehicles[1].id) is vehicles[1]
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_get_energy_site_refreshes_cached_listing(api, make_client):
+    async def main():
+        client = make_client()
+        client.discovery_min_age = 0
+        sites = await client.list_energy_sites()
+        api.energy_site_ids.append(999999)
+        api.energy_site_ids.remove(sites[0].site_id)
+
+        site = await client.get_energy_site(999999)
+        assert site is not None and site.site_id == 999999
+        assert await client.get_energy_site(sites[0].site_id) is None
+        assert await client.get_energy_site(sites[1].site_id) is sites[1]
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_restarted_client_looks_up_from_cache_file(api, make_client, tmp_path):
+    cache_file = str(tmp_path / 'discovery.json')
+
+    async def main():
+        client = make_client(cache_file=cache_file)
+        vehicle_id = (await client.list_vehicles())[0].id
+        site_id = (await client.list_energy_sites())[0].site_id
+        await client.close()
+
+        requests = api.stats['requests']
+        client = make_client(cache_file=cache_file)
+        assert (await client.get_vehicle(vehicle_id)).id == vehicle_id
+        assert (await client.get_energy_site(site_id)).site_id == site_id
+        assert api.stats['requests'] == requests
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_unknown_id_refreshes_listing_at_most_once_per_min_age(api, make_client):
+    async def main():
+        client = make_client()
+        await client.list_vehicles()
+        requests = api.stats['requests']
+        for vehicle_id in (97, 98, 99):
+            assert await client.get_vehicle(vehicle_id) is None
+        assert api.stats['requests'] == requests
+
+        client.discovery_min_age = 0
+        assert await client.get_vehicle(99) is None
+        assert api.stats['requests'] == requests + 1
+        await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+import asyncio
+
+from tesla_api.const import EventType, RequestPriority
+from tesla_api.events import EventDispatcher
+from tesla_api.scheduler import request_priority, use_priority
+
+
+def test_handler_does_not_inherit_priority_of_first_publish():
+    async def main():
+        dispatcher = EventDispatcher()
+        seen = []
+        handled = asyncio.Event()
+
+        async def on_update(payload):
+            seen.append(request_priority.get())
+            handled.set()
+
+        dispatcher.add_handler(EventType.UPDATE, on_update)
+        with use_priority(RequestPriority.BACKGROUND):
+            await dispatcher.publish(EventType.UPDATE, None)
+        await asyncio.wait_for(handled.wait(), 1)
+        assert seen == [None]
+        await dispatcher.close()
+
+    asyncio.run(main())
+
+
+def test_handler_requests_use_default_priority(make_client):
+    async def main():
+        client = make_client()
+        vehicle = (await client.list_vehicles())[0]
+        priorities = []
+        handled = asyncio.Event()
+        acquire = client.scheduler.acquire
+
+        async def record_acquire(priority):
+            priorities.append(priority)
+            await acquire(priority)
+
+        async def on_update(_):
+            if not handled.is_set():
+                client.scheduler.acquire = record_acquire
+                await client.get('vehicles')
+                client.scheduler.acquire = acquire
+                handled.set()
+
+        client.events.add_handler(EventType.UPDATE, on_update)
+        # A poller would publish the first update with the BACKGROUND priority.
+        with use_priority(RequestPriority.BACKGROUND):
+            await vehicle.update()
+        await asyncio.wait_for(handled.wait(), 1)
+        assert priorities == [RequestPriority.FOREGROUND]
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_new_token_is_never_dropped_or_blocked_by_full_queue():
+    async def main():
+        dispatcher = EventDispatcher(maxsize=4, workers=2)
+        tokens = []
+        updates = 0
+        release = asyncio.Event()
+
+        async def on_update(payload):
+            nonlocal updates
+            updates += 1
+            # Handlers may refresh the token implicitly, which publishes NEW_TOKEN.
+            await asyncio.wait_for(dispatcher.publish(EventType.NEW_TOKEN, payload), 0.1)
+            await release.wait()
+
+        async def on_new_token(payload):
+            tokens.append(payload)
+
+        dispatcher.add_handler(EventType.UPDATE, on_update)
+        dispatcher.add_handler(EventType.NEW_TOKEN, on_new_token)
+        for vehicle_id in range(8):
+            await dispatcher.publish(EventType.UPDATE, vehicle_id, key=vehicle_id)
+        await asyncio.sleep(0.05)
+        # Both workers are held up by updates and the queue is full.
+        assert await asyncio.wait_for(dispatcher.publish(EventType.NEW_TOKEN, 'token'), 0.1)
+
+        release.set()
+        await dispatcher.close()
+        # The latest token replaced those published before it and was delivered
+        # ahead of the queued updates.
+        assert tokens[0] == 'token'
+        assert updates == 4
+        assert dispatcher.dropped == 4
+        assert dispatcher.errors == 0
+
+    asyncio.run(main())
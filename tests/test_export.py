@@ -0,0 +1,108 @@
+import csv
+import json
+import logging
+
+import pytest
+
+from tesla_api.export import CsvExporter, InfluxExporter, JsonLinesExporter, ParquetExporter
+
+
+def _point(minute, **fields):
+    return {'timestamp': '2020-05-01T00:{:02d}:00Z'.format(minute), **fields}
+
+
+def test_checkpoint_resumes_export(tmp_path):
+    path = str(tmp_path / 'points.jsonl')
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+
+    with JsonLinesExporter(path, chunk_size=2, checkpoint_file=checkpoint_file) as exporter:
+        assert exporter.write(1, 'power', _point(0, solar_power=1))
+        assert exporter.write(1, 'power', _point(5, solar_power=2))
+        # Not newer than the last point.
+        assert not exporter.write(1, 'power', _point(5, solar_power=3))
+        assert exporter.write(2, 'power', _point(0, solar_power=4))
+
+    with open(checkpoint_file) as file:
+        assert json.load(file) == {'1/power': '2020-05-01T00:05:00Z', '2/power': '2020-05-01T00:00:00Z'}
+
+    with JsonLinesExporter(path, chunk_size=2, checkpoint_file=checkpoint_file) as exporter:
+        assert not exporter.write(1, 'power', _point(5, solar_power=2))
+        assert exporter.write(1, 'power', _point(10, solar_power=5))
+        assert exporter.write(1, 'energy', _point(0, solar_energy=6))
+
+    with open(path) as file:
+        points = [json.loads(line) for line in file]
+    assert [point.get('solar_power', point.get('solar_energy')) for point in points] == [1, 2, 4, 5, 6]
+    assert points[0]['site_id'] == 1 and points[0]['measurement'] == 'power'
+
+
+def test_checkpoint_only_advances_after_flush(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    exporter = JsonLinesExporter(str(tmp_path / 'points.jsonl'), chunk_size=10,
+                                 checkpoint_file=checkpoint_file)
+    exporter.write(1, 'power', _point(0, solar_power=1))
+    assert exporter.checkpoint == {}
+    exporter.close()
+    assert exporter.checkpoint == {'1/power': '2020-05-01T00:00:00Z'}
+
+
+def test_csv_reuses_header_of_existing_file(tmp_path):
+    path = str(tmp_path / 'points.csv')
+    with CsvExporter(path) as exporter:
+        exporter.write(1, 'power', _point(0, solar_power=1, grid_power=2))
+    with CsvExporter(path) as exporter:
+        # A missing field is left empty and an unknown one is ignored.
+        exporter.write(1, 'power', _point(5, solar_power=3, battery_power=4))
+
+    with open(path, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows == [
+        ['site_id', 'measurement', 'timestamp', 'solar_power', 'grid_power'],
+        ['1', 'power', '2020-05-01T00:00:00Z', '1', '2'],
+        ['1', 'power', '2020-05-01T00:05:00Z', '3', ''],
+    ]
+
+
+def test_influx_line_protocol(tmp_path):
+    path = str(tmp_path / 'points.txt')
+    with InfluxExporter(path) as exporter:
+        exporter.write('site 1', 'live,status', _point(
+            0, solar_power=0, backup_capable='True', storm_mode_active=False,
+            grid_status='Active "on"', generator_power=None))
+        # Points without any fields are skipped.
+        exporter.write('site 1', 'power', _point(5, generator_power=None))
+
+    with open(path) as file:
+        lines = file.read().splitlines()
+    assert lines == [
+        r'live\,status,site_id=site\ 1 solar_power=0.0,backup_capable=true,'
+        r'storm_mode_active=false,grid_status="Active \"on\"" 1588291200000000000'
+    ]
+
+
+def test_parquet_schema_is_explicit(tmp_path, caplog):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    path = str(tmp_path / 'points.parquet')
+    with ParquetExporter(path, chunk_size=2) as exporter:
+        # generator_power is null throughout the first chunk.
+        exporter.write(1, 'power', _point(0, solar_power=1, generator_power=None, grid_status='Active'))
+        exporter.write(1, 'power', _point(5, solar_power=2, grid_status='Islanded'))
+        with caplog.at_level(logging.WARNING, logger='tesla_api.export'):
+            exporter.write(1, 'power', _point(10, solar_power='3', generator_power=4, battery_power=5))
+            exporter.write(1, 'power', _point(15, solar_power='n/a', grid_status=True))
+
+    table = pyarrow.parquet.read_table(path)
+    assert table.schema.field('timestamp').type == pyarrow.timestamp('us', tz='UTC')
+    assert table.schema.field('solar_power').type == pyarrow.float64()
+    assert table.schema.field('generator_power').type == pyarrow.float64()
+    assert table.schema.field('grid_status').type == pyarrow.string()
+    assert 'battery_power' not in table.schema.names
+    assert 'battery_power' in caplog.text
+
+    columns = table.to_pydict()
+    assert columns['solar_power'] == [1, 2, 3, None]
+    assert columns['generator_power'] == [None, None, 4, None]
+    assert columns['grid_status'] == ['Active', 'Islanded', None, 'True']
+    assert columns['site_id'] == ['1'] * 4
@@ -0,0 +1,97 @@
+import asyncio
+import gc
+
+from tesla_api.const import RequestPriority
+from tesla_api.hedging import Hedger, LatencyTracker
+
+
+def test_hedged_get_times_only_http_exchange(make_client):
+    async def main():
+        client = make_client()
+        client.hedger = Hedger(tracker=LatencyTracker(min_samples=1))
+        client.scheduler.limits[RequestPriority.FOREGROUND] = 1
+
+        async def hold_slot():
+            async with client.scheduler.slot(RequestPriority.FOREGROUND):
+                await asyncio.sleep(0.2)
+
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        await client.get('vehicles', hedge=True)
+        await holder
+        assert client.hedger.tracker.threshold('vehicles') < 0.1
+        assert client.hedger.hedged == 0
+        await client.close()
+
+    asyncio.run(main())
+
+
+class _RecordingTracker(LatencyTracker):
+    def __init__(self):
+        super().__init__(min_samples=1)
+        self.recorded = []
+
+    def record(self, key, latency):
+        super().record(key, latency)
+        self.recorded.append(latency)
+
+
+def test_cancelled_attempt_latency_is_recorded():
+    async def hedged_request(delays):
+        tracker = _RecordingTracker()
+        tracker.record('key', 0.02)
+        hedger = Hedger(tracker=tracker)
+        delays = iter(delays)
+
+        async def request():
+            await asyncio.sleep(next(delays))
+            return 'response'
+
+        assert await hedger.request('key', request) == 'response'
+        await asyncio.sleep(0)
+        assert hedger.hedged == 1
+        return tracker.recorded[1:]
+
+    async def main():
+        # The duplicate wins: it is recorded, and so is the cancelled original,
+        # measured from when the original started.
+        recorded = await hedged_request([1, 0])
+        assert len(recorded) == 2
+        assert recorded[0] < 0.02 <= recorded[1]
+
+        # The original wins: the losing duplicate only ran for part of the request
+        # and is not recorded.
+        recorded = await hedged_request([0.03, 1])
+        assert len(recorded) == 1
+        assert recorded[0] >= 0.03
+
+    asyncio.run(main())
+
+
+def test_failed_losing_attempt_exception_is_retrieved():
+    async def main():
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        tracker = LatencyTracker(min_samples=1)
+        tracker.record('key', 0.01)
+        hedger = Hedger(tracker=tracker)
+        futures = [loop.create_future(), loop.create_future()]
+        attempts = iter(futures)
+
+        async def request():
+            return await next(attempts)
+
+        async def complete():
+            await asyncio.sleep(0.05)
+            # Both attempts complete at once; only one response is used.
+            futures[0].set_result('response')
+            futures[1].set_exception(ValueError())
+
+        asyncio.create_task(complete())
+        assert await hedger.request('key', request) == 'response'
+        await asyncio.sleep(0)
+        gc.collect()
+        assert errors == []
+
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import math
+
+from tesla_api.history import HistoryParser, parse_history
+
+
+def _body(time_series):
+    return json.dumps({'response': {'serial_number': 'SIM', 'time_series': time_series}})
+
+
+POINTS = [
+    {'timestamp': '2020-05-01T00:00:00Z', 'solar_power': 100, 'grid_status': 'Active'},
+    {'solar_power': 150},
+    {'timestamp': '2020-05-01T00:05:00+01:00', 'battery_power': -20.5, 'backup_capable': 'True'},
+    {'timestamp': 'not a timestamp', 'solar_power': 175},
+    {'timestamp': '2020-05-01T00:10:00', 'solar_power': None, 'backup_capable': False},
+]
+
+
+def _check(response):
+    assert response['serial_number'] == 'SIM'
+    columns = response['time_series']
+    assert list(columns['timestamp']) == [1588291200, 1588287900, 1588291800]
+    assert columns['solar_power'][0] == 100
+    assert all(math.isnan(value) for value in columns['solar_power'][1:])
+    assert math.isnan(columns['battery_power'][0])
+    assert columns['battery_power'][1] == -20.5
+    assert list(columns['backup_capable'][1:]) == [1, 0]
+    assert all(math.isnan(value) for value in columns['grid_status'])
+    assert all(len(column) == 3 for column in columns.values())
+
+
+def test_parse_history():
+    _check(parse_history(_body(POINTS)))
+
+
+def test_parse_history_without_time_series():
+    response = parse_history(json.dumps({'response': {'serial_number': 'SIM'}}))
+    assert list(response['time_series']['timestamp']) == []
+
+
+def test_history_parser_in_process():
+    async def main():
+        parser = HistoryParser(workers=1, min_size=1 << 20)
+        _check(await parser.parse(_body(POINTS)))
+        assert parser._executor is None
+        parser.close()
+
+    asyncio.run(main())
+
+
+def test_history_parser_in_pool():
+    async def main():
+        parser = HistoryParser(workers=1, min_size=0)
+        try:
+            _check(await parser.parse(_body(POINTS)))
+            assert parser._executor is not None
+        finally:
+            parser.close()
+
+    asyncio.run(main())
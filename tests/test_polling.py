@@ -0,0 +1,37 @@
+import asyncio
+
+from tesla_api.polling import VehiclePoller
+
+
+def test_slow_on_data_does_not_hold_up_polls(api, make_client):
+    for vehicle in api.vehicles.values():
+        vehicle.state = 'online'
+
+    async def main():
+        client = make_client()
+        vehicles = await client.list_vehicles()
+        delivered = set()
+        all_delivered = asyncio.Event()
+        finished = []
+
+        async def on_data(vehicle, data):
+            delivered.add(vehicle.id)
+            if len(delivered) == len(vehicles):
+                all_delivered.set()
+            try:
+                # Never returns, as a stuck consumer would.
+                await asyncio.sleep(10)
+            finally:
+                finished.append(vehicle.id)
+
+        poller = VehiclePoller(vehicles, on_data, idle_interval=0.03, concurrency=1)
+        task = asyncio.create_task(poller.run())
+        await asyncio.wait_for(all_delivered.wait(), 1)
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # run() has waited for the cancelled deliveries.
+        assert sorted(finished) == sorted(delivered)
+        await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from tesla_api.const import RequestPriority
+from tesla_api.exceptions import RequestPreemptedError
+from tesla_api.scheduler import RequestScheduler
+
+
+async def _acquire_later(scheduler, priority, started):
+    await scheduler.acquire(priority)
+    started.append(priority)
+
+
+def test_queued_requests_start_in_priority_order():
+    async def main():
+        scheduler = RequestScheduler(max_concurrency=1)
+        await scheduler.acquire(RequestPriority.BACKGROUND)
+        started = []
+        tasks = [asyncio.create_task(_acquire_later(scheduler, priority, started))
+                 for priority in (RequestPriority.BACKGROUND, RequestPriority.FOREGROUND,
+                                  RequestPriority.BACKGROUND, RequestPriority.FOREGROUND)]
+        await asyncio.sleep(0)
+        assert started == []
+        assert scheduler.queued == {RequestPriority.BACKGROUND: 2, RequestPriority.FOREGROUND: 2}
+
+        held = RequestPriority.BACKGROUND
+        for _ in tasks:
+            scheduler.release(held)
+            await asyncio.sleep(0)
+            held = started[-1]
+        await asyncio.gather(*tasks)
+        assert started == [RequestPriority.FOREGROUND, RequestPriority.FOREGROUND,
+                           RequestPriority.BACKGROUND, RequestPriority.BACKGROUND]
+
+    asyncio.run(main())
+
+
+def test_request_does_not_overtake_queued_requests():
+    async def main():
+        scheduler = RequestScheduler(limits={RequestPriority.BACKGROUND: 1})
+        await scheduler.acquire(RequestPriority.BACKGROUND)
+        started = []
+        queued = asyncio.create_task(_acquire_later(scheduler, RequestPriority.BACKGROUND, started))
+        await asyncio.sleep(0)
+        scheduler.release(RequestPriority.BACKGROUND)
+        # The slot was granted to the queued request, not to a new one.
+        late = asyncio.create_task(_acquire_later(scheduler, RequestPriority.BACKGROUND, started))
+        await asyncio.sleep(0)
+        assert not late.done()
+        await queued
+        scheduler.release(RequestPriority.BACKGROUND)
+        await late
+        assert len(started) == 2
+
+    asyncio.run(main())
+
+
+def test_preempt_fails_queued_background_requests():
+    async def main():
+        scheduler = RequestScheduler(max_concurrency=1)
+        await scheduler.acquire(RequestPriority.FOREGROUND)
+        started = []
+        background = [asyncio.create_task(_acquire_later(scheduler, RequestPriority.BACKGROUND, started))
+                      for _ in range(2)]
+        foreground = asyncio.create_task(_acquire_later(scheduler, RequestPriority.FOREGROUND, started))
+        await asyncio.sleep(0)
+
+        assert scheduler.preempt() == 2
+        for task in background:
+            with pytest.raises(RequestPreemptedError):
+                await task
+        assert scheduler.queued == {RequestPriority.FOREGROUND: 1}
+
+        scheduler.release(RequestPriority.FOREGROUND)
+        await foreground
+        assert started == [RequestPriority.FOREGROUND]
+
+    asyncio.run(main())
+
+
+def test_cancelled_request_releases_granted_slot():
+    async def main():
+        scheduler = RequestScheduler(limits={RequestPriority.FOREGROUND: 1})
+        await scheduler.acquire(RequestPriority.FOREGROUND)
+        started = []
+        cancelled = asyncio.create_task(_acquire_later(scheduler, RequestPriority.FOREGROUND, started))
+        waiting = asyncio.create_task(_acquire_later(scheduler, RequestPriority.FOREGROUND, started))
+        await asyncio.sleep(0)
+
+        # The slot is granted to the first request, which is cancelled before it runs.
+        scheduler.release(RequestPriority.FOREGROUND)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        await asyncio.wait_for(waiting, 1)
+        assert started == [RequestPriority.FOREGROUND]
+
+    asyncio.run(main())
+
+
+def test_cancelled_queued_request_is_skipped():
+    async def main():
+        scheduler = RequestScheduler(limits={RequestPriority.FOREGROUND: 1})
+        await scheduler.acquire(RequestPriority.FOREGROUND)
+        started = []
+        cancelled = asyncio.create_task(_acquire_later(scheduler, RequestPriority.FOREGROUND, started))
+        waiting = asyncio.create_task(_acquire_later(scheduler, RequestPriority.FOREGROUND, started))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.queued == {RequestPriority.FOREGROUND: 1}
+
+        scheduler.release(RequestPriority.FOREGROUND)
+        await asyncio.wait_for(waiting, 1)
+        assert started == [RequestPriority.FOREGROUND]
+
+    asyncio.run(main())
+
+
+def test_interactive_and_token_refresh_do_not_wait_for_shared_limit():
+    async def main():
+        scheduler = RequestScheduler(max_concurrency=2)
+        for _ in range(2):
+            await scheduler.acquire(RequestPriority.BACKGROUND)
+        started = []
+        queued = asyncio.create_task(_acquire_later(scheduler, RequestPriority.FOREGROUND, started))
+
+        for _ in range(scheduler.limits[RequestPriority.INTERACTIVE]):
+            await asyncio.wait_for(scheduler.acquire(RequestPriority.INTERACTIVE), 0.1)
+        await asyncio.wait_for(scheduler.acquire(RequestPriority.TOKEN_REFRESH), 0.1)
+        await asyncio.sleep(0)
+        assert started == []
+
+        # Releasing them does not make room for the shared classes either.
+        scheduler.release(RequestPriority.INTERACTIVE)
+        scheduler.release(RequestPriority.TOKEN_REFRESH)
+        await asyncio.sleep(0)
+        assert started == []
+
+        scheduler.release(RequestPriority.BACKGROUND)
+        await asyncio.wait_for(queued, 1)
+
+    asyncio.run(main())
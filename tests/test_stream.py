@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from tesla_api.const import TESLA_API_URL_CALENDAR_HISTORY, TESLA_API_URL_ENERGY_SITES
+from tesla_api.exceptions import DeadlineExceededError
+from tesla_api.stream import iter_json_array
+
+
+def _history_endpoint(site_id):
+    return '{}/{}/{}'.format(TESLA_API_URL_ENERGY_SITES, site_id, TESLA_API_URL_CALENDAR_HISTORY)
+
+
+def test_stream_yields_all_elements(api, make_client):
+    async def main():
+        client = make_client()
+        site = (await client.list_energy_sites())[0]
+        points = [point async for point in client.stream(
+            _history_endpoint(site.site_id), 'time_series', timeout=5)]
+        assert len(points) == api.history_points
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_stream_timeout_with_slow_consumer(api, make_client):
+    api.history_points = 100
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = make_client()
+        site = (await client.list_energy_sites())[0]
+        start = loop.time()
+        count = 0
+        with pytest.raises(DeadlineExceededError):
+            async for _ in client.stream(_history_endpoint(site.site_id), 'time_series', timeout=0.3):
+                count += 1
+                await asyncio.sleep(0.01)
+        assert 0 < count < api.history_points
+        assert loop.time() - start < 0.6
+        # The consumer's task was not cancelled, so it can carry on.
+        await asyncio.sleep(0.01)
+        assert client.scheduler.queued == {}
+        await client.close()
+
+    asyncio.run(main())
+
+
+async def _chunks(body, size):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def _parse(body, key, size):
+    async def main():
+        return [element async for element in iter_json_array(_chunks(body, size), key)]
+    return asyncio.run(main())
+
+
+DOCUMENT = {
+    'response': {
+        'serial_number': 'ü "time_series": [0]',
+        'period': 'day',
+        'time_series': [
+            12345, -0.5e3, 1.25, 'Zürich ☀ 😀', True, None, [1, [2]],
+            {'timestamp': '2020-05-01T00:00:00Z', 'solar_power': 1234.5, 'note': 'a,]}"b'},
+        ],
+        'tail': [9],
+    }
+}
+
+
+@pytest.mark.parametrize('size', range(1, 8))
+def test_iter_json_array_small_chunks(size):
+    body = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode()
+    assert _parse(body, 'time_series', size) == DOCUMENT['response']['time_series']
+
+
+@pytest.mark.parametrize('size', [1, 3, 7])
+def test_iter_json_array_numbers_split_across_chunks(size):
+    body = json.dumps({'time_series': list(range(1000, 1100)) + [12.5e-3]}).encode()
+    assert _parse(body, 'time_series', size) == list(range(1000, 1100)) + [12.5e-3]
+
+
+def test_iter_json_array_number_at_end_of_truncated_chunk_is_not_yielded_early():
+    async def main():
+        arrived = []
+
+        async def chunks():
+            for chunk in (b'{"time_series": [12', b'34, 5', b'6]}'):
+                arrived.append(chunk)
+                yield chunk
+
+        elements = []
+        async for element in iter_json_array(chunks(), 'time_series'):
+            elements.append((element, len(arrived)))
+        return elements
+
+    # Each element is yielded as soon as the delimiter after it has arrived.
+    assert asyncio.run(main()) == [(1234, 2), (56, 3)]
+
+
+def test_iter_json_array_missing_key_or_empty_array():
+    assert _parse(b'{"response": {"other": [1]}}', 'time_series', 3) == []
+    assert _parse(b'{"time_series": [ ]}', 'time_series', 3) == []
+
+
+@pytest.mark.parametrize('body', [
+    b'{"time_series": [1, 2',
+    b'{"time_series": [1, {"a": 2',
+    b'{"time_series": [1, "abc',
+    b'{"time_series": [1, 2, ',
+])
+def test_iter_json_array_truncated_raises(body):
+    for size in (1, 4, len(body)):
+        with pytest.raises(json.JSONDecodeError):
+            _parse(body, 'time_series', size)